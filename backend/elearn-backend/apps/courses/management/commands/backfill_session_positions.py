@@ -0,0 +1,43 @@
+"""
+Management command: backfill_session_positions
+----------------------------------------------
+One-off migration step for the switch from dense session numbers to
+fractional order keys. The new `position` column was added with a single
+default key, so every session of a week and weekday ties; this rebuilds the
+keys of those lists from the old `session_number` column. Batch sessions
+pushed before they recorded their course session are linked to it by rank,
+so later pushes and syncs find them.
+
+Run once after deploying, before anyone reorders sessions:
+    python manage.py backfill_session_positions
+    python manage.py backfill_session_positions --dry-run
+
+Lists that already have distinct keys, or a linked batch session, are left
+alone.
+"""
+from django.core.management.base import BaseCommand
+from apps.courses.services import backfill_session_positions
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds session order keys from the legacy session_number column.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many sessions would be re-keyed.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING('=== Backfilling session positions ==='))
+
+        summary = backfill_session_positions(dry_run=options['dry_run'])
+        linked = summary.pop('linked')
+        for model_name, count in summary.items():
+            self.stdout.write(f"  {model_name}: {count} session(s) re-keyed")
+        self.stdout.write(f"  BatchClassSession: {linked} session(s) linked to their course session")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run – nothing was written.'))
+        self.stdout.write(self.style.SUCCESS('Done.'))
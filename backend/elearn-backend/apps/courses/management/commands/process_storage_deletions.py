@@ -0,0 +1,60 @@
+"""
+Management command: process_storage_deletions
+---------------------------------------------
+Drains the StorageDeletion queue: objects no longer referenced by any class
+session are removed from the bucket with batched delete_objects calls.
+Objects recently handed out by upload deduplication are postponed until
+their lease ends. Failed keys are retried with exponential backoff.
+
+Usage:
+    python manage.py process_storage_deletions            # drain once and exit (cron)
+    python manage.py process_storage_deletions --loop     # long-running worker
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.courses.services import process_storage_deletions
+
+
+class Command(BaseCommand):
+    help = 'Deletes queued, unreferenced storage objects in batches of up to 1000 keys.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Keys per delete_objects call (max 1000).',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the queue instead of exiting once it is empty.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10.0,
+            help='Seconds to sleep between polls when the queue is empty (with --loop).',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING('=== Processing storage deletions ==='))
+        totals = {'deleted': 0, 'skipped': 0, 'leased': 0, 'failed': 0}
+
+        while True:
+            summary = process_storage_deletions(batch_size=options['batch_size'])
+            for name in totals:
+                totals[name] += summary[name]
+            if summary['claimed']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(f"  Deleted: {totals['deleted']}")
+        self.stdout.write(f"  Skipped: {totals['skipped']} (still referenced)")
+        if totals['leased']:
+            self.stdout.write(f"  Leased : {totals['leased']} (postponed until the dedup lease ends)")
+        if totals['failed']:
+            self.stdout.write(self.style.WARNING(f"  Failed : {totals['failed']} (will be retried)"))
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,72 @@
+"""
+Management command: reap_stale_uploads
+--------------------------------------
+Aborts multipart video uploads that were started but never completed or
+aborted (browser closed, network lost, ...). Their parts are billed until the
+upload is aborted. Uploads that were resumed or fetched part URLs recently
+are skipped.
+
+Usage:
+    python manage.py reap_stale_uploads
+    python manage.py reap_stale_uploads --older-than-hours 48 --workers 16
+    python manage.py reap_stale_uploads --dry-run
+
+Intended to be scheduled (e.g. hourly cron / platform scheduler).
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.courses.services import reap_stale_multipart_uploads
+
+
+class Command(BaseCommand):
+    help = 'Aborts stale multipart uploads under class_videos/ and reports the bytes reclaimed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-hours',
+            type=int,
+            default=settings.STALE_UPLOAD_MAX_AGE_HOURS,
+            help='Abort uploads initiated more than this many hours ago.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.STALE_UPLOAD_REAP_BATCH_SIZE,
+            help='Number of uploads aborted per parallel batch.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.STALE_UPLOAD_REAP_WORKERS,
+            help='Number of parallel abort requests.',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='class_videos/',
+            help='Only consider uploads whose key starts with this prefix.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be reclaimed without aborting anything.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING('=== Reaping stale multipart uploads ==='))
+
+        summary = reap_stale_multipart_uploads(
+            max_age_hours=options['older_than_hours'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            prefix=options['prefix'],
+            dry_run=options['dry_run'],
+        )
+
+        action = 'Would abort' if options['dry_run'] else 'Aborted'
+        self.stdout.write(f"  Scanned  : {summary['scanned']} upload(s)")
+        self.stdout.write(f"  Active   : {summary['active']} upload(s) still being resumed, skipped")
+        self.stdout.write(f"  {action:<9}: {summary['aborted']} upload(s)")
+        self.stdout.write(f"  Reclaimed: {summary['reclaimed_bytes'] / (1024 * 1024):.2f} MB")
+        if summary['failed']:
+            self.stdout.write(self.style.WARNING(f"  Failed   : {summary['failed']} upload(s), see logs"))
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,21 @@
+"""
+Management command: rebuild_stored_objects
+------------------------------------------
+Recomputes the StoredObject reference counts from CourseClassSession and
+BatchClassSession. Run once after deploying the index, and any time the
+counts are suspected to have drifted (e.g. after raw SQL data fixes).
+
+Usage:
+    python manage.py rebuild_stored_objects
+"""
+from django.core.management.base import BaseCommand
+from apps.courses.services import rebuild_stored_object_counts
+
+
+class Command(BaseCommand):
+    help = 'Recomputes StoredObject reference counts from the class session tables.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING('=== Rebuilding stored object index ==='))
+        indexed = rebuild_stored_object_counts()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} object key(s).'))
@@ -0,0 +1,69 @@
+"""
+Management command: run_clone_jobs
+----------------------------------
+Worker for queued CloneJob rows ("push content to batch"). Each job is run in
+slices of weeks so its progress is visible to the status endpoint while it runs.
+Jobs left RUNNING by a crashed worker are picked up again once their heartbeat
+is older than CLONE_JOB_STALE_SECONDS.
+
+Usage:
+    python manage.py run_clone_jobs            # run everything queued and exit (cron)
+    python manage.py run_clone_jobs --loop     # long-running worker
+    python manage.py run_clone_jobs --requeue-failed   # retry failed jobs, then run
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.courses.models import CloneJob
+from apps.courses.services import claim_next_clone_job, requeue_clone_job, run_clone_job
+
+
+class Command(BaseCommand):
+    help = 'Runs queued content clone jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new jobs instead of exiting once the queue is empty.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep between polls when the queue is empty (with --loop).',
+        )
+        parser.add_argument(
+            '--requeue-failed',
+            action='store_true',
+            help='Put every failed job back on the queue before running.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.MIGRATE_HEADING('=== Running clone jobs ==='))
+
+        if options['requeue_failed']:
+            failed = CloneJob.objects.filter(status=CloneJob.Status.FAILED)
+            for job in failed:
+                requeue_clone_job(job)
+                self.stdout.write(f"  Re-queued job {job.id} → batch {job.target_batch_id}")
+
+        while True:
+            job = claim_next_clone_job()
+            if job is None:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            job = run_clone_job(job)
+            line = (
+                f"  Job {job.id} → batch {job.target_batch_id}: {job.status} "
+                f"({job.weeks_processed} weeks, {job.sessions_processed} sessions, "
+                f"{job.questions_processed} questions)"
+            )
+            if job.status == job.Status.FAILED:
+                self.stdout.write(self.style.WARNING(f"{line} – {job.error}"))
+            else:
+                self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -1,9 +1,16 @@
-import uuid
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
+from django.db.models import BooleanField, Case, Count, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from utils.codes import batch_codes, course_codes
 
 
 # Tag
@@ -19,6 +26,25 @@ class Tag(models.Model):
         return self.name
 
 
+class CourseQuerySet(models.QuerySet):
+    def with_enrolled_batch(self, user):
+        """
+        Annotates enrolled_batch_id / enrolled_batch_name: the earliest batch
+        of each course `user` is enrolled in (None if none), resolved for the
+        whole page in the same query.
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                enrolled_batch_id=Value(None, output_field=models.IntegerField()),
+                enrolled_batch_name=Value(None, output_field=models.CharField()),
+            )
+        batches = Batch.objects.filter(course=OuterRef('pk'), enrollments__student=user).order_by('start_date', 'pk')
+        return self.annotate(
+            enrolled_batch_id=Subquery(batches.values('pk')[:1]),
+            enrolled_batch_name=Subquery(batches.values('name')[:1]),
+        )
+
+
 # Course
 class Course(models.Model):
     class DifficultyLevel(models.TextChoices):
@@ -60,6 +86,8 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         verbose_name        = _('Course')
         verbose_name_plural = _('Courses')
@@ -75,21 +103,49 @@ class Course(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.course_code:
-            self.course_code = self._gen_code()
+            self.course_code = course_codes.next()
         super().save(*args, **kwargs)
 
-    @staticmethod
-    def _gen_code():
-        while True:
-            code = f"CRS{uuid.uuid4().hex[:6].upper()}"
-            if not Course.objects.filter(course_code=code).exists():
-                return code
-
     @property
     def total_weeks(self):
         return self.course_weeks.count()
 
 
+def count_subquery(queryset, fk='batch'):
+    """COUNT(*) of `queryset` rows pointing at the outer row, as an expression (0 when none)."""
+    counts = queryset.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+class BatchQuerySet(models.QuerySet):
+    def with_list_stats(self):
+        """
+        Annotates enrolled_total, weeks_count, weeks_unlocked, at_capacity and
+        progress_percent (unlocked weeks / total weeks) as correlated
+        subqueries, so a page of batches is a single query and joins added by
+        other filters cannot inflate the counts.
+        """
+        now = timezone.now()
+        return self.annotate(
+            enrolled_total=count_subquery(BatchEnrollment.objects.all()),
+            weeks_count=count_subquery(BatchWeek.objects.all()),
+            weeks_unlocked=count_subquery(
+                BatchWeek.objects.filter(Q(unlock_date__isnull=True) | Q(unlock_date__lte=now))
+            ),
+        ).annotate(
+            at_capacity=ExpressionWrapper(Q(enrolled_total__gte=F('max_students')), output_field=BooleanField()),
+            progress_percent=Case(
+                When(weeks_count=0, then=Value(0.0)),
+                default=Cast(F('weeks_unlocked'), FloatField()) * 100 / F('weeks_count'),
+                output_field=FloatField(),
+            ),
+        )
+
+    def bump_content_version(self):
+        """Invalidates cached content trees (ETags) of these batches with one UPDATE."""
+        return self.update(content_version=F('content_version') + 1)
+
+
 # Batch
 class Batch(models.Model):
     class Status(models.TextChoices):
@@ -129,6 +185,15 @@ class Batch(models.Model):
         default=Status.ACTIVE
     )
 
+    content_synced_at = models.DateTimeField(
+        _('Content Synced At'), null=True, blank=True,
+        help_text=_('Watermark: course content updated before this has been applied to this batch')
+    )
+    content_version = models.PositiveIntegerField(
+        _('Content Version'), default=0, editable=False,
+        help_text=_('Bumped on every write to the batch weeks, sessions or tests; part of the content ETag')
+    )
+
     created_by = models.ForeignKey(
         'users.User', on_delete=models.SET_NULL, null=True, blank=True,
         related_name='created_batches'
@@ -140,6 +205,8 @@ class Batch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BatchQuerySet.as_manager()
+
     class Meta:
         verbose_name        = _('Batch')
         verbose_name_plural = _('Batches')
@@ -162,18 +229,13 @@ class Batch(models.Model):
     def save(self, *args, **kwargs):
         self.clean()
         if not self.batch_code:
-            self.batch_code = self._gen_code()
+            self.batch_code = batch_codes.next()
         super().save(*args, **kwargs)
 
-    @staticmethod
-    def _gen_code():
-        while True:
-            code = f"BAT{uuid.uuid4().hex[:6].upper()}"
-            if not Batch.objects.filter(batch_code=code).exists():
-                return code
-
     @property
     def enrolled_count(self):
+        if hasattr(self, 'enrolled_total'):
+            return self.enrolled_total
         return self.enrollments.all().count()
 
     @property
@@ -279,7 +341,7 @@ class StudentSessionView(models.Model):
     def __str__(self):
         return (
             f"{self.enrollment.student.fullname} | "
-            f"{self.batch_session.title} | {self.watched_percent:.0f}%"
+            f"{self.batch_session.get_content('title')} | {self.watched_percent:.0f}%"
         )
 
 
@@ -322,8 +384,44 @@ class CourseWeek(models.Model):
         return f"{self.course.title} – Week {self.week_number}: {self.title}"
 
 
+class InheritedContentMixin:
+    """
+    Copy-on-write support for batch rows that mirror a course row.
+
+    While `inherits_content` is set, the fields in INHERITED_FIELDS are read
+    from the linked course row (`SOURCE_FIELD`) instead of this row, which
+    only keeps its batch-specific columns. `materialize()` copies the course
+    content into the row and breaks the link; it is called before a teacher
+    edits inherited content and when the course row is deleted.
+    """
+    SOURCE_FIELD = None
+    INHERITED_FIELDS = ()
+
+    @property
+    def content_source(self):
+        if not self.inherits_content:
+            return None
+        return getattr(self, self.SOURCE_FIELD)
+
+    def get_content(self, name):
+        return getattr(self.content_source or self, name)
+
+    def copy_inherited_content(self):
+        source = self.content_source
+        if source is not None:
+            for name in self.INHERITED_FIELDS:
+                setattr(self, name, getattr(source, name))
+        self.inherits_content = False
+
+    def materialize(self):
+        if not self.inherits_content:
+            return
+        self.copy_inherited_content()
+        self.save()
+
+
 # Batch Week
-class BatchWeek(models.Model):
+class BatchWeek(InheritedContentMixin, models.Model):
     batch = models.ForeignKey(
         Batch, on_delete=models.CASCADE, related_name='batch_weeks'
     )
@@ -333,6 +431,15 @@ class BatchWeek(models.Model):
 
     unlock_date  = models.DateTimeField(_('Unlock Date'), null=True, blank=True)
     is_extended  = models.BooleanField(_('Extended'), default=False)
+
+    source_week      = models.ForeignKey(
+        CourseWeek, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='linked_batch_weeks'
+    )
+    inherits_content = models.BooleanField(
+        _('Inherits Course Content'), default=False,
+        help_text=_('Title and description are read from source_week until edited')
+    )
     
     is_published = models.BooleanField(
         _('Published'), default=True,
@@ -340,6 +447,14 @@ class BatchWeek(models.Model):
     )
     created_at   = models.DateTimeField(auto_now_add=True)
     updated_at   = models.DateTimeField(auto_now=True)
+    content_edited_at = models.DateTimeField(
+        _('Content Edited At'), default=timezone.now, editable=False,
+        help_text=_('Last change to CONTENT_FIELDS; course sync keeps batch edits newer than the course row')
+    )
+
+    SOURCE_FIELD     = 'source_week'
+    INHERITED_FIELDS = ('title', 'description')
+    CONTENT_FIELDS   = INHERITED_FIELDS
 
     class Meta:
         verbose_name        = _('Batch Week')
@@ -352,7 +467,7 @@ class BatchWeek(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.batch.name} – Week {self.week_number}: {self.title}"
+        return f"{self.batch.name} – Week {self.week_number}: {self.get_content('title')}"
 
     @property
     def is_unlocked(self):
@@ -377,13 +492,72 @@ WEEKDAY_CHOICES = [
 ]
 
 
+class SessionQuerySet(models.QuerySet):
+    def with_session_numbers(self):
+        """
+        Annotates the visible session number (rank of `position` within week
+        and weekday). A correlated count, so it stays right on filtered
+        querysets and single-row `.get()`s.
+        """
+        earlier = self.model.objects.filter(
+            **{self.model.WEEK_FIELD: OuterRef(self.model.WEEK_FIELD)}, weekday=OuterRef('weekday'),
+        ).filter(
+            Q(position__lt=OuterRef('position')) | Q(position=OuterRef('position'), id__lt=OuterRef('id'))
+        ).order_by().values(self.model.WEEK_FIELD).annotate(count=Count('id')).values('count')
+        return self.annotate(ordinal=Coalesce(Subquery(earlier), 0) + 1)
+
+
+def number_sessions(sessions):
+    """Fills the visible session number of already-loaded sessions in memory."""
+    ranked = sorted(sessions, key=lambda s: (s.week_key, s.weekday, s.position, s.id))
+    previous, number = None, 0
+    for session in ranked:
+        group = (session.week_key, session.weekday)
+        number = number + 1 if group == previous else 1
+        previous = group
+        session.__dict__.setdefault('ordinal', number)
+    return sessions
+
+
+class PositionedSessionMixin:
+    """
+    Sessions are ordered within their week and weekday by a fractional
+    `position` key (see utils.ordering), so inserting, moving or deleting one
+    never rewrites its siblings. `visible_number` is derived from that order:
+    annotated by `with_session_numbers()` / `number_sessions()` on reads,
+    otherwise counted once and cached on the instance.
+    """
+    WEEK_FIELD = None
+
+    @property
+    def week_key(self):
+        return getattr(self, f'{self.WEEK_FIELD}_id')
+
+    def siblings(self):
+        return type(self).objects.filter(**{f'{self.WEEK_FIELD}_id': self.week_key, 'weekday': self.weekday})
+
+    @property
+    def visible_number(self):
+        if 'ordinal' not in self.__dict__:
+            self.ordinal = self.siblings().filter(
+                Q(position__lt=self.position) | Q(position=self.position, id__lt=self.id)
+            ).count() + 1
+        return self.ordinal
+
+
 # Course Class Session (template content, attached to a CourseWeek)
-class CourseClassSession(models.Model):
+class CourseClassSession(PositionedSessionMixin, models.Model):
     """A recorded session that belongs to a course week (the content template)."""
 
     course_week = models.ForeignKey(
         CourseWeek, on_delete=models.CASCADE, related_name='class_sessions'
     )
+    position       = models.CharField(
+        _('Order Key'), max_length=64, default='i',
+        help_text=_('Fractional sort key within the week and weekday; the session number is derived from it')
+    )
+    # Dense number from before sessions were ordered by `position`; no longer
+    # maintained, only read by `manage.py backfill_session_positions`
     session_number = models.PositiveSmallIntegerField(
         _('Session Number within Week'), default=1
     )
@@ -422,26 +596,36 @@ class CourseClassSession(models.Model):
     created_at     = models.DateTimeField(auto_now_add=True)
     updated_at     = models.DateTimeField(auto_now=True)
 
+    WEEK_FIELD = 'course_week'
+
+    objects = SessionQuerySet.as_manager()
+
     class Meta:
         verbose_name        = _('Course Class Session')
         verbose_name_plural = _('Course Class Sessions')
-        ordering            = ['course_week__week_number', 'session_number']
-        unique_together     = ('course_week', 'weekday', 'session_number')
+        ordering            = ['course_week__week_number', 'position', 'id']
         indexes             = [
             models.Index(fields=['course_week'], name='crsess_week_idx'),
+            models.Index(fields=['course_week', 'weekday', 'position'], name='crsess_order_idx'),
         ]
 
     def __str__(self):
-        return f"Week {self.course_week.week_number} | S{self.session_number}: {self.title}"
+        return f"Week {self.course_week.week_number} | {self.get_weekday_display()}: {self.title}"
 
 
 # Batch Class Session (live/batch-specific content, attached to a BatchWeek)
-class BatchClassSession(models.Model):
+class BatchClassSession(PositionedSessionMixin, InheritedContentMixin, models.Model):
     """A recorded session that belongs to a batch week (the actual delivery)."""
 
     batch_week = models.ForeignKey(
         BatchWeek, on_delete=models.CASCADE, related_name='class_sessions'
     )
+    position       = models.CharField(
+        _('Order Key'), max_length=64, default='i',
+        help_text=_('Fractional sort key within the week and weekday; the session number is derived from it')
+    )
+    # Dense number from before sessions were ordered by `position`; no longer
+    # maintained, only read by `manage.py backfill_session_positions`
     session_number = models.PositiveSmallIntegerField(
         _('Session Number within Week'), default=1
     )
@@ -476,20 +660,40 @@ class BatchClassSession(models.Model):
         'users.User', on_delete=models.SET_NULL, null=True, blank=True,
         related_name='updated_batch_sessions'
     )
+    source_session   = models.ForeignKey(
+        CourseClassSession, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='linked_batch_sessions'
+    )
+    inherits_content = models.BooleanField(
+        _('Inherits Course Content'), default=False,
+        help_text=_('Title, description, video, thumbnail and duration are read from source_session until edited')
+    )
+
     created_at     = models.DateTimeField(auto_now_add=True)
     updated_at     = models.DateTimeField(auto_now=True)
+    content_edited_at = models.DateTimeField(
+        _('Content Edited At'), default=timezone.now, editable=False,
+        help_text=_('Last change to CONTENT_FIELDS; course sync keeps batch edits newer than the course row')
+    )
+
+    SOURCE_FIELD     = 'source_session'
+    INHERITED_FIELDS = ('title', 'description', 'video_file', 'thumbnail', 'duration_seconds')
+    CONTENT_FIELDS   = INHERITED_FIELDS
+    WEEK_FIELD       = 'batch_week'
+
+    objects = SessionQuerySet.as_manager()
 
     class Meta:
         verbose_name        = _('Batch Class Session')
         verbose_name_plural = _('Batch Class Sessions')
-        ordering            = ['batch_week__week_number', 'session_number']
-        unique_together     = ('batch_week', 'weekday', 'session_number')
+        ordering            = ['batch_week__week_number', 'position', 'id']
         indexes             = [
             models.Index(fields=['batch_week'], name='bsess_week_idx'),
+            models.Index(fields=['batch_week', 'weekday', 'position'], name='bsess_order_idx'),
         ]
 
     def __str__(self):
-        return f"Week {self.batch_week.week_number} | S{self.session_number}: {self.title}"
+        return f"Week {self.batch_week.week_number} | {self.get_weekday_display()}: {self.get_content('title')}"
 
 
 
@@ -553,6 +757,7 @@ class CourseTestQuestion(models.Model):
     )
     order = models.PositiveIntegerField(_('Order'), default=1)
     marks = models.FloatField(_('Marks'), default=1.0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering        = ['order', 'id']
@@ -592,6 +797,12 @@ class BatchWeeklyTest(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    content_edited_at = models.DateTimeField(
+        _('Content Edited At'), default=timezone.now, editable=False,
+        help_text=_('Last change to CONTENT_FIELDS; course sync keeps batch edits newer than the course row')
+    )
+
+    CONTENT_FIELDS = ('title', 'instructions', 'pass_percentage')
 
     class Meta:
         verbose_name        = _('Batch Weekly Test')
@@ -625,6 +836,13 @@ class BatchTestQuestion(models.Model):
     )
     order = models.PositiveIntegerField(_('Order'), default=1)
     marks = models.FloatField(_('Marks'), default=1.0)
+    updated_at = models.DateTimeField(auto_now=True)
+    content_edited_at = models.DateTimeField(
+        _('Content Edited At'), default=timezone.now, editable=False,
+        help_text=_('Last change to CONTENT_FIELDS; course sync keeps batch edits newer than the course row')
+    )
+
+    CONTENT_FIELDS = ('text', 'question_file', 'image', 'marks')
 
     class Meta:
         ordering        = ['order', 'id']
@@ -963,3 +1181,464 @@ class BatchChatMessage(models.Model):
         preview = (self.message[:40] + '…') if len(self.message) > 40 else self.message
         return f"{sender_name} → {self.batch.name}: {preview}"
 
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# UploadSession  (server-side record of a direct-to-R2 multipart upload)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class UploadSession(models.Model):
+    """
+    Tracks a multipart video upload so it can be resumed after the browser
+    loses its in-memory state (crash, reload, network drop).
+    `completed_parts` mirrors the last known S3 ListParts result.
+    """
+
+    class Status(models.TextChoices):
+        IN_PROGRESS = 'in_progress', _('In Progress')
+        COMPLETED   = 'completed',   _('Completed')
+        ABORTED     = 'aborted',     _('Aborted')
+
+    key          = models.CharField(_('Object Key'), max_length=1024, unique=True)
+    upload_id    = models.CharField(_('Upload ID'), max_length=1024)
+    owner        = models.ForeignKey(
+        'users.User', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='upload_sessions'
+    )
+    filename     = models.CharField(_('Original Filename'), max_length=255)
+    content_type = models.CharField(_('Content Type'), max_length=100)
+    file_size    = models.PositiveBigIntegerField(_('File Size (bytes)'))
+    part_size    = models.PositiveBigIntegerField(_('Part Size (bytes)'))
+    total_parts  = models.PositiveIntegerField(_('Total Parts'))
+    completed_parts = models.JSONField(
+        _('Completed Parts'), default=list, blank=True,
+        help_text=_('List of {"PartNumber", "ETag", "Size"} already stored in the bucket')
+    )
+    status       = models.CharField(
+        _('Status'), max_length=20,
+        choices=Status.choices, default=Status.IN_PROGRESS
+    )
+    created_at   = models.DateTimeField(auto_now_add=True)
+    updated_at   = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name        = _('Upload Session')
+        verbose_name_plural = _('Upload Sessions')
+        ordering            = ['-created_at']
+        indexes             = [
+            models.Index(fields=['upload_id'],         name='upload_upload_id_idx'),
+            models.Index(fields=['owner', 'status'],   name='upload_owner_status_idx'),
+            models.Index(fields=['status', 'created_at'], name='upload_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} [{self.status}] {len(self.completed_parts)}/{self.total_parts} parts"
+
+    @property
+    def missing_part_numbers(self):
+        done = {part['PartNumber'] for part in self.completed_parts}
+        return [n for n in range(1, self.total_parts + 1) if n not in done]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CloneJob  (background "push content to batch" request)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class CloneJob(models.Model):
+    """
+    A queued content push from a Course or another Batch into `target_batch`.
+    Run by `manage.py run_clone_jobs`; the counters are updated as the worker
+    progresses so the UI can poll the job. `heartbeat_at` is bumped after every
+    slice, so a RUNNING job whose heartbeat goes stale is reclaimed by the next
+    worker.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED    = 'queued',    _('Queued')
+        RUNNING   = 'running',   _('Running')
+        SUCCEEDED = 'succeeded', _('Succeeded')
+        FAILED    = 'failed',    _('Failed')
+
+    target_batch  = models.ForeignKey(
+        Batch, on_delete=models.CASCADE, related_name='clone_jobs'
+    )
+    source_course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    source_batch  = models.ForeignKey(
+        Batch, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    requested_by  = models.ForeignKey(
+        'users.User', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='clone_jobs'
+    )
+    status        = models.CharField(
+        _('Status'), max_length=20,
+        choices=Status.choices, default=Status.QUEUED
+    )
+
+    total_weeks         = models.PositiveIntegerField(_('Total Weeks'), default=0)
+    weeks_processed     = models.PositiveIntegerField(_('Weeks Processed'), default=0)
+    sessions_processed  = models.PositiveIntegerField(_('Sessions Processed'), default=0)
+    questions_processed = models.PositiveIntegerField(_('Questions Processed'), default=0)
+    error               = models.TextField(_('Error'), blank=True)
+
+    created_at   = models.DateTimeField(auto_now_add=True)
+    started_at   = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name        = _('Clone Job')
+        verbose_name_plural = _('Clone Jobs')
+        ordering            = ['-created_at']
+        indexes             = [
+            models.Index(fields=['status', 'created_at'], name='clonejob_status_created_idx'),
+            models.Index(fields=['target_batch'],         name='clonejob_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"Clone into {self.target_batch_id} [{self.status}] {self.weeks_processed}/{self.total_weeks} weeks"
+
+    @property
+    def progress_percent(self):
+        if self.status == self.Status.SUCCEEDED:
+            return 100
+        if not self.total_weeks:
+            return 0
+        return round(self.weeks_processed * 100 / self.total_weeks)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TimelineExtension  (audit of unlock-date shifts)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TimelineExtension(models.Model):
+    """
+    One row per batch each time its remaining weeks are pushed back.
+    Records the days added and which weeks were shifted.
+    """
+    batch          = models.ForeignKey(
+        Batch, on_delete=models.CASCADE, related_name='timeline_extensions'
+    )
+    days           = models.PositiveSmallIntegerField(_('Days Added'))
+    weeks_affected = models.PositiveSmallIntegerField(_('Weeks Affected'), default=0)
+    week_numbers   = models.JSONField(_('Week Numbers'), default=list, blank=True)
+    reason         = models.CharField(_('Reason'), max_length=255, blank=True)
+    extended_by    = models.ForeignKey(
+        'users.User', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='timeline_extensions'
+    )
+    created_at     = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name        = _('Timeline Extension')
+        verbose_name_plural = _('Timeline Extensions')
+        ordering            = ['-created_at']
+        indexes             = [
+            models.Index(fields=['batch', 'created_at'], name='timeline_ext_batch_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.batch_id}: +{self.days} days on {self.weeks_affected} week(s)"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# StoredObject  (reference count per storage key)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class StoredObjectManager(models.Manager):
+
+    def count_references(self, keys=None):
+        """Counts the session rows whose video_file is each key (all keys when None)."""
+        counts = Counter()
+        for model in (CourseClassSession, BatchClassSession):
+            rows = model.objects.exclude(video_file__isnull=True).exclude(video_file='')
+            if keys is not None:
+                rows = rows.filter(video_file__in=list(keys))
+            for key, refs in rows.order_by().values('video_file').annotate(refs=Count('id')).values_list('video_file', 'refs'):
+                counts[key] += refs
+        return counts
+
+    def resync(self, keys):
+        """Sets ref_count of `keys` to the references counted in the session tables (creating rows as needed)."""
+        keys = set(keys)
+        if not keys:
+            return
+        counts = self.count_references(keys)
+        self.bulk_create([StoredObject(key=key, ref_count=0) for key in keys], ignore_conflicts=True)
+        self.filter(key__in=keys).update(ref_count=0)
+        self._apply(counts, 1)
+
+    def _seed(self, keys):
+        """
+        Creates the rows missing for `keys` (objects referenced before the
+        index existed) from a count of the session tables. Callers record a
+        write that is already in those tables, so the seeded keys must not
+        get the write's delta on top. Returns the seeded keys.
+        """
+        if not keys:
+            return set()
+        missing = set(keys) - set(self.filter(key__in=list(keys)).values_list('key', flat=True))
+        self.resync(missing)
+        return missing
+
+    def retain(self, keys):
+        """Adds one reference per occurrence of each key (creating rows as needed)."""
+        counts = Counter(key for key in keys if key)
+        for key in self._seed(counts):
+            del counts[key]
+        if counts:
+            self._apply(counts, 1)
+
+    def release(self, keys):
+        """Drops one reference per occurrence of each key (never below zero)."""
+        counts = Counter(key for key in keys if key)
+        for key in self._seed(counts):
+            del counts[key]
+        if counts:
+            self._apply(counts, -1)
+
+    def _apply(self, counts, sign):
+        # One UPDATE per distinct delta; usually a single statement.
+        by_delta = {}
+        for key, n in counts.items():
+            by_delta.setdefault(n, []).append(key)
+        for n, keys in by_delta.items():
+            self.filter(key__in=keys).update(
+                ref_count=Greatest(F('ref_count') + sign * n, 0)
+            )
+
+    def find_by_content_hash(self, content_hash, exclude_key=None):
+        """
+        Returns the key of a live object with the same content, or None.
+        Objects already queued for deletion are not reused.
+        """
+        if not content_hash:
+            return None
+        objects = self.filter(content_hash=content_hash).exclude(
+            key__in=StorageDeletion.objects.values('key')
+        )
+        if exclude_key:
+            objects = objects.exclude(key=exclude_key)
+        return objects.order_by('-ref_count', 'created_at').values_list('key', flat=True).first()
+
+    def lease_by_content_hash(self, content_hash, exclude_key=None):
+        """
+        Like find_by_content_hash, but also leases the object for
+        STORAGE_GC_DEDUP_LEASE_SECONDS so the storage GC keeps it until the
+        uploader saves a session that references it. Returns the key or None.
+        """
+        key = self.find_by_content_hash(content_hash, exclude_key=exclude_key)
+        if key is None:
+            return None
+        leased_until = timezone.now() + timedelta(seconds=settings.STORAGE_GC_DEDUP_LEASE_SECONDS)
+        # Re-checked in the same statement: a key queued since the lookup is not reused
+        leased = self.filter(key=key).exclude(
+            key__in=StorageDeletion.objects.values('key')
+        ).update(leased_until=leased_until)
+        return key if leased else None
+
+    def record_content_hash(self, key, content_hash):
+        self.bulk_create([StoredObject(key=key, ref_count=0)], ignore_conflicts=True)
+        self.filter(key=key).update(content_hash=content_hash)
+
+
+class StoredObject(models.Model):
+    """
+    One row per storage object key referenced by class sessions.
+    `ref_count` is the number of CourseClassSession / BatchClassSession rows
+    whose `video_file` points at the key; maintained by the signals below and
+    by bulk clone paths. Keys without a row yet are seeded from a count of
+    the session tables on first use; `manage.py rebuild_stored_objects`
+    repairs drift.
+    """
+
+    key        = models.CharField(_('Object Key'), max_length=1024, primary_key=True)
+    ref_count  = models.PositiveIntegerField(_('Reference Count'), default=0)
+    content_hash = models.CharField(
+        _('Content Hash'), max_length=128,
+        null=True, blank=True, db_index=True,
+        help_text=_('"etag:<multipart etag>:<size>" as returned by storage; never taken from the client')
+    )
+    leased_until = models.DateTimeField(
+        _('Leased Until'), null=True, blank=True,
+        help_text=_('Handed out by upload deduplication; the storage GC keeps the object until then')
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StoredObjectManager()
+
+    class Meta:
+        verbose_name        = _('Stored Object')
+        verbose_name_plural = _('Stored Objects')
+
+    def __str__(self):
+        return f"{self.key} ({self.ref_count} refs)"
+
+
+class StorageDeletionManager(models.Manager):
+
+    def enqueue(self, keys):
+        """
+        Queues object keys for deletion. A key that is already queued, even
+        one the worker gave up on, starts over with a fresh retry budget.
+        """
+        keys = {key for key in keys if key}
+        if keys:
+            now = timezone.now()
+            self.bulk_create(
+                [StorageDeletion(key=key, attempts=0, next_attempt_at=now, last_error='') for key in keys],
+                update_conflicts=True,
+                unique_fields=['key'],
+                update_fields=['attempts', 'next_attempt_at', 'last_error'],
+            )
+
+
+class StorageDeletion(models.Model):
+    """
+    Durable queue of storage objects waiting to be deleted from the bucket.
+    Drained by `manage.py process_storage_deletions`, which re-checks the
+    StoredObject reference count before deleting and retries with backoff.
+    """
+
+    key             = models.CharField(_('Object Key'), max_length=1024, unique=True)
+    attempts        = models.PositiveSmallIntegerField(_('Attempts'), default=0)
+    next_attempt_at = models.DateTimeField(_('Next Attempt At'), default=timezone.now)
+    last_error      = models.TextField(_('Last Error'), blank=True)
+    created_at      = models.DateTimeField(auto_now_add=True)
+
+    objects = StorageDeletionManager()
+
+    class Meta:
+        verbose_name        = _('Storage Deletion')
+        verbose_name_plural = _('Storage Deletions')
+        ordering            = ['next_attempt_at']
+        indexes             = [
+            models.Index(fields=['next_attempt_at'], name='stordel_next_attempt_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} (attempt {self.attempts})"
+
+
+@receiver(pre_save, sender=BatchWeek)
+@receiver(pre_save, sender=BatchClassSession)
+@receiver(pre_save, sender=BatchWeeklyTest)
+@receiver(pre_save, sender=BatchTestQuestion)
+def stamp_batch_content_edit(sender, instance, update_fields=None, **kwargs):
+    """
+    Moves `content_edited_at` when a save changes the synced content of a
+    batch row, so course sync can tell batch edits from publish toggles,
+    reorders and timeline shifts (which also bump updated_at). Sync and push
+    write with bulk operations and never pass through here.
+    """
+    fields = sender.CONTENT_FIELDS
+    if instance.pk is None or (update_fields is not None and not set(update_fields) & set(fields)):
+        return
+    stored = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    if stored is None or all(getattr(instance, name) == stored[name] for name in fields):
+        return
+    instance.content_edited_at = timezone.now()
+    if update_fields is not None:
+        # save(update_fields=...) will not write the stamp itself
+        sender.objects.filter(pk=instance.pk).update(content_edited_at=instance.content_edited_at)
+
+
+@receiver(pre_save, sender=CourseClassSession)
+@receiver(pre_save, sender=BatchClassSession)
+def remember_previous_video_file(sender, instance, **kwargs):
+    """
+    Stores the video key currently in the database so post_save can move the
+    reference when it changes.
+    """
+    instance._previous_video_file = None
+    if instance.pk:
+        instance._previous_video_file = (
+            sender.objects.filter(pk=instance.pk).values_list('video_file', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=CourseClassSession)
+@receiver(post_save, sender=BatchClassSession)
+def track_video_file_reference(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_video_file', None)
+    if previous == instance.video_file:
+        return
+    StoredObject.objects.release([previous])
+    StoredObject.objects.retain([instance.video_file])
+
+
+@receiver(post_delete, sender=CourseClassSession)
+@receiver(post_delete, sender=BatchClassSession)
+def release_video_file_reference(sender, instance, **kwargs):
+    if instance.video_file:
+        StoredObject.objects.release([instance.video_file])
+        StorageDeletion.objects.enqueue([instance.video_file])
+
+
+@receiver(pre_delete, sender=CourseWeek)
+@receiver(pre_delete, sender=CourseClassSession)
+def materialize_linked_batch_content(sender, instance, **kwargs):
+    """
+    Batch rows still inheriting from a course row that is being deleted get
+    their own copy of the content first (one bulk_update per course row).
+    The bulk write skips the save signals, so the affected batches' content
+    versions are bumped here.
+    """
+    if sender is CourseWeek:
+        model, linked = BatchWeek, instance.linked_batch_weeks.filter(inherits_content=True)
+    else:
+        model, linked = BatchClassSession, instance.linked_batch_sessions.filter(inherits_content=True)
+    linked = list(linked)
+    if not linked:
+        return
+    for row in linked:
+        setattr(row, row.SOURCE_FIELD, instance)
+        row.copy_inherited_content()
+    model.objects.bulk_update(linked, list(model.INHERITED_FIELDS) + ['inherits_content'])
+    if model is BatchClassSession:
+        StoredObject.objects.retain(row.video_file for row in linked)
+        batches = Batch.objects.filter(batch_weeks__in={row.batch_week_id for row in linked})
+    else:
+        batches = Batch.objects.filter(pk__in={row.batch_id for row in linked})
+    batches.bump_content_version()
+
+
+@receiver(post_save, sender=BatchWeek)
+@receiver(post_delete, sender=BatchWeek)
+@receiver(post_save, sender=BatchClassSession)
+@receiver(post_delete, sender=BatchClassSession)
+@receiver(post_save, sender=BatchWeeklyTest)
+@receiver(post_delete, sender=BatchWeeklyTest)
+@receiver(post_save, sender=BatchTestQuestion)
+@receiver(post_delete, sender=BatchTestQuestion)
+@receiver(post_save, sender=BatchTestQuestionAttachment)
+@receiver(post_delete, sender=BatchTestQuestionAttachment)
+@receiver(post_save, sender=CourseWeek)
+@receiver(post_save, sender=CourseClassSession)
+def bump_batch_content_version(sender, instance, **kwargs):
+    """
+    Bumps the content version of the batch a content row belongs to, or of
+    the batches still inheriting a course row's content. Bulk writes skip
+    signals and bump the version themselves (see apps.courses.services).
+    """
+    if sender is BatchWeek:
+        batches = Batch.objects.filter(pk=instance.batch_id)
+    elif sender is BatchClassSession or sender is BatchWeeklyTest:
+        batches = Batch.objects.filter(batch_weeks=instance.batch_week_id)
+    elif sender is BatchTestQuestion:
+        batches = Batch.objects.filter(batch_weeks__weekly_test=instance.test_id)
+    elif sender is BatchTestQuestionAttachment:
+        batches = Batch.objects.filter(batch_weeks__weekly_test__questions=instance.question_id)
+    elif sender is CourseWeek:
+        batches = Batch.objects.filter(
+            batch_weeks__source_week=instance.pk, batch_weeks__inherits_content=True
+        )
+    else:
+        batches = Batch.objects.filter(
+            batch_weeks__class_sessions__source_session=instance.pk,
+            batch_weeks__class_sessions__inherits_content=True,
+        )
+    batches.bump_content_version()
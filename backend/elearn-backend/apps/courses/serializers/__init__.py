@@ -8,6 +8,7 @@ from .batch_serializers import (
     BatchListSerializer,
     BatchCreateUpdateSerializer,
     BatchEnrollmentSerializer,
+    CloneJobSerializer,
 )
 from .course_module_serializers import (
     CourseWeekSerializer,
@@ -38,6 +39,7 @@ __all__ = [
     'BatchListSerializer',
     'BatchCreateUpdateSerializer',
     'BatchEnrollmentSerializer',
+    'CloneJobSerializer',
     'CourseWeekSerializer',
     'CourseWeekCreateUpdateSerializer',
     'CourseClassSessionSerializer',
@@ -3,19 +3,21 @@ Serializers for the Batch models.
 """
 from utils.common import ServiceError
 from rest_framework import serializers
-from apps.courses.models import Course, Batch, BatchEnrollment
+from apps.courses.models import Course, Batch, BatchEnrollment, CloneJob
+from apps.courses.services import load_enrollment_progress
 from rest_framework import status
 
 
 class BatchListSerializer(serializers.ModelSerializer):
     """
     Lightweight serializer for listing batches.
+    Expects a queryset from Batch.objects.with_list_stats() for the counts.
     """
     teacher_name = serializers.CharField(source='teacher.fullname', read_only=True)
-    enrolled_count = serializers.IntegerField(read_only=True)
-    is_full = serializers.BooleanField(read_only=True)
+    enrolled_count = serializers.IntegerField(source='enrolled_total', read_only=True)
+    is_full = serializers.BooleanField(source='at_capacity', read_only=True)
     progress_percent = serializers.FloatField(read_only=True)
-    weeks_count = serializers.SerializerMethodField()
+    weeks_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Batch
@@ -25,9 +27,6 @@ class BatchListSerializer(serializers.ModelSerializer):
             'start_date', 'status', 'progress_percent', 'weeks_count', 'created_at', 'updated_at'
         ]
 
-    def get_weeks_count(self, obj):
-        return obj.batch_weeks.count()
-
 
 class BatchCreateUpdateSerializer(serializers.ModelSerializer):
     """
@@ -89,6 +88,19 @@ class BatchCreateUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
+class EnrollmentProgressListSerializer(serializers.ListSerializer):
+    """
+    Loads the progress metrics of the whole page with a fixed number of
+    grouped queries (load_enrollment_progress) before the rows are rendered.
+    """
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        progress = load_enrollment_progress(items)
+        for item in items:
+            item.progress_metrics = progress[item.id]
+        return [self.child.to_representation(item) for item in items]
+
+
 class BatchEnrollmentSerializer(serializers.ModelSerializer):
     """
     Serializer for enrolling a student into a batch.
@@ -96,16 +108,16 @@ class BatchEnrollmentSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.fullname', read_only=True)
     student_email = serializers.EmailField(source='student.email', read_only=True)
 
-    # Progress fields (Mocked for now, to be implemented with real logic)
-    overall_progress = serializers.SerializerMethodField()
-    weeks_completed = serializers.SerializerMethodField()
-    total_weeks = serializers.SerializerMethodField()
-    weekly_tests_submitted = serializers.SerializerMethodField()
-    total_weekly_tests = serializers.SerializerMethodField()
-    quizzes_done = serializers.SerializerMethodField()
-    total_quizzes = serializers.SerializerMethodField()
-    marks_obtained = serializers.SerializerMethodField()
-    total_marks = serializers.SerializerMethodField()
+    # Progress fields, see load_enrollment_progress()
+    overall_progress = serializers.FloatField(source='progress_metrics.overall_progress', read_only=True)
+    weeks_completed = serializers.IntegerField(source='progress_metrics.weeks_completed', read_only=True)
+    total_weeks = serializers.IntegerField(source='progress_metrics.total_weeks', read_only=True)
+    weekly_tests_submitted = serializers.IntegerField(source='progress_metrics.weekly_tests_submitted', read_only=True)
+    total_weekly_tests = serializers.IntegerField(source='progress_metrics.total_weekly_tests', read_only=True)
+    quizzes_done = serializers.IntegerField(source='progress_metrics.quizzes_done', read_only=True)
+    total_quizzes = serializers.IntegerField(source='progress_metrics.total_quizzes', read_only=True)
+    marks_obtained = serializers.FloatField(source='progress_metrics.marks_obtained', read_only=True)
+    total_marks = serializers.FloatField(source='progress_metrics.total_marks', read_only=True)
 
     class Meta:
         model = BatchEnrollment
@@ -119,33 +131,25 @@ class BatchEnrollmentSerializer(serializers.ModelSerializer):
             'marks_obtained', 'total_marks'
         ]
         read_only_fields = ['id', 'batch', 'enrolled_at', 'created_at', 'student_name', 'student_email']
+        list_serializer_class = EnrollmentProgressListSerializer
 
-    def get_overall_progress(self, obj):
-        return 15.0 # Mock
-
-    def get_weeks_completed(self, obj):
-        return 2 # Mock
-
-    def get_total_weeks(self, obj):
-        if obj.batch and obj.batch.course:
-            return obj.batch.course.total_weeks
-        return 0
-
-    def get_weekly_tests_submitted(self, obj):
-        return 1 # Mock
+    def to_representation(self, instance):
+        if not hasattr(instance, 'progress_metrics'):
+            instance.progress_metrics = load_enrollment_progress([instance])[instance.id]
+        return super().to_representation(instance)
 
-    def get_total_weekly_tests(self, obj):
-        return 3 # Mock
 
-    def get_quizzes_done(self, obj):
-        return 0 # Mock
-
-    def get_total_quizzes(self, obj):
-        return 2 # Mock
-
-    def get_marks_obtained(self, obj):
-        return 0 # Mock
-
-    def get_total_marks(self, obj):
-        return 0 # Mock
+class CloneJobSerializer(serializers.ModelSerializer):
+    """
+    Read-only view of a background content clone job, polled by the UI.
+    """
+    progress_percent = serializers.IntegerField(read_only=True)
 
+    class Meta:
+        model = CloneJob
+        fields = [
+            'id', 'target_batch', 'source_course', 'source_batch', 'status',
+            'total_weeks', 'weeks_processed', 'sessions_processed', 'questions_processed',
+            'progress_percent', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -4,12 +4,59 @@ from apps.courses.models import (
     CourseWeeklyTest, CourseTestQuestion, CourseTestQuestionAttachment,
     BatchWeeklyTest, BatchTestQuestion, BatchTestQuestionAttachment,
     BatchWeek,
-    PostSessionQuestion, PostSessionChoice
+    PostSessionQuestion, PostSessionChoice,
+    WEEKDAY_CHOICES, number_sessions,
 )
 from utils.common import ServiceError
+from utils.storage import presign, presign_many
 from rest_framework import status
 
 
+class PresignedVideoListSerializer(serializers.ListSerializer):
+    """
+    Presigns every video key of the list in one pass before the rows are
+    rendered, so the per-row `video_presigned_url` is a dict lookup, and
+    numbers the sessions in memory so `session_number` needs no query.
+    """
+    def to_representation(self, data):
+        items = number_sessions(list(data.all() if hasattr(data, 'all') else data))
+        self.child._presigned_urls = presign_many(video_key_of(obj) for obj in items)
+        return [self.child.to_representation(item) for item in items]
+
+
+def video_key_of(obj):
+    """The effective video key (batch sessions may inherit it from the course)."""
+    source = getattr(obj, 'content_source', None)
+    return (source or obj).video_file
+
+
+def resolve_video_presigned_url(serializer, obj):
+    video_key = video_key_of(obj)
+    if not video_key:
+        return None
+    urls = getattr(serializer, '_presigned_urls', None) or {}
+    if video_key in urls:
+        return urls[video_key]
+    return presign(video_key)
+
+
+class InheritedContentSerializerMixin:
+    """
+    Renders copy-on-write batch rows with the content of the course row they
+    still inherit from (see InheritedContentMixin), so clients never see the
+    difference between linked and materialized rows.
+    """
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        source = getattr(instance, 'content_source', None)
+        if source is not None:
+            for name in instance.INHERITED_FIELDS:
+                if name in self.fields:
+                    value = getattr(source, name)
+                    data[name] = None if value is None else self.fields[name].to_representation(value)
+        return data
+
+
 class PostSessionChoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostSessionChoice
@@ -25,6 +72,7 @@ class PostSessionQuestionSerializer(serializers.ModelSerializer):
         read_only_fields = ['course_session']
 
 class CourseClassSessionSerializer(serializers.ModelSerializer):
+    session_number = serializers.IntegerField(source='visible_number', read_only=True)
     video_presigned_url = serializers.SerializerMethodField()
     mcq_questions = PostSessionQuestionSerializer(many=True, read_only=True)
 
@@ -36,34 +84,14 @@ class CourseClassSessionSerializer(serializers.ModelSerializer):
             'mcq_questions', 'uploaded_by', 'updated_by', 'created_at', 'updated_at'
         ]
         read_only_fields = ['uploaded_by', 'updated_by', 'created_at', 'updated_at']
+        list_serializer_class = PresignedVideoListSerializer
 
     def get_video_presigned_url(self, obj):
-        if not obj.video_file:
-            return None
-        try:
-            from django.conf import settings
-            import boto3
-            s3_client = boto3.client(
-                's3',
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'auto'),
-            )
-            url = s3_client.generate_presigned_url(
-                ClientMethod='get_object',
-                Params={
-                    'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                    'Key': obj.video_file
-                },
-                ExpiresIn=14400  # 4 hours
-            )
-            return url
-        except Exception:
-            return None
-
-
-class BatchClassSessionSerializer(serializers.ModelSerializer):
+        return resolve_video_presigned_url(self, obj)
+
+
+class BatchClassSessionSerializer(InheritedContentSerializerMixin, serializers.ModelSerializer):
+    session_number = serializers.IntegerField(source='visible_number', read_only=True)
     video_presigned_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -71,34 +99,13 @@ class BatchClassSessionSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'batch_week', 'session_number', 'title', 'description', 'weekday',
             'video_file', 'video_presigned_url', 'thumbnail', 'duration_seconds',
-            'uploaded_by', 'updated_by', 'created_at', 'updated_at'
+            'inherits_content', 'uploaded_by', 'updated_by', 'created_at', 'updated_at'
         ]
         read_only_fields = ['uploaded_by', 'updated_by', 'created_at', 'updated_at']
+        list_serializer_class = PresignedVideoListSerializer
 
     def get_video_presigned_url(self, obj):
-        if not obj.video_file:
-            return None
-        try:
-            from django.conf import settings
-            import boto3
-            s3_client = boto3.client(
-                's3',
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'auto'),
-            )
-            url = s3_client.generate_presigned_url(
-                ClientMethod='get_object',
-                Params={
-                    'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                    'Key': obj.video_file
-                },
-                ExpiresIn=14400
-            )
-            return url
-        except Exception:
-            return None
+        return resolve_video_presigned_url(self, obj)
 
 
 class CourseWeekSerializer(serializers.ModelSerializer):
@@ -120,7 +127,7 @@ class CourseWeekSerializer(serializers.ModelSerializer):
         return None
 
 
-class BatchWeekSerializer(serializers.ModelSerializer):
+class BatchWeekSerializer(InheritedContentSerializerMixin, serializers.ModelSerializer):
     class_sessions = BatchClassSessionSerializer(many=True, read_only=True)
     weekly_test = serializers.SerializerMethodField()
     is_unlocked = serializers.ReadOnlyField()
@@ -130,7 +137,7 @@ class BatchWeekSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'batch', 'week_number', 'title', 'description', 
             'unlock_date', 'is_extended', 'is_unlocked', 'is_published', 
-            'class_sessions', 'weekly_test', 'created_at', 'updated_at'
+            'inherits_content', 'class_sessions', 'weekly_test', 'created_at', 'updated_at'
         ]
 
     def get_weekly_test(self, obj):
@@ -161,6 +168,9 @@ class CourseWeekCreateUpdateSerializer(serializers.ModelSerializer):
 
 
 class CourseClassSessionCreateUpdateSerializer(serializers.ModelSerializer):
+    # Desired slot within the weekday; stored as an order key by the view
+    session_number = serializers.IntegerField(required=False)
+
     class Meta:
         model = CourseClassSession
         fields = [
@@ -175,6 +185,9 @@ class CourseClassSessionCreateUpdateSerializer(serializers.ModelSerializer):
 
 
 class BatchClassSessionCreateUpdateSerializer(serializers.ModelSerializer):
+    # Desired slot within the weekday; stored as an order key by the view
+    session_number = serializers.IntegerField(required=False)
+
     class Meta:
         model = BatchClassSession
         fields = [
@@ -188,6 +201,21 @@ class BatchClassSessionCreateUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
+class CourseWeekReorderSerializer(serializers.Serializer):
+    week_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False,
+        help_text="Every week id of the course, in the desired order."
+    )
+
+
+class ClassSessionReorderSerializer(serializers.Serializer):
+    weekday = serializers.ChoiceField(choices=WEEKDAY_CHOICES)
+    session_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False,
+        help_text="Every session id of the week on this weekday, in the desired order."
+    )
+
+
 class CourseTestQuestionAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = CourseTestQuestionAttachment
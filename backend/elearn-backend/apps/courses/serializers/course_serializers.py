@@ -14,7 +14,19 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
-class CourseListSerializer(serializers.ModelSerializer):
+class EnrolledBatchSerializerMixin:
+    """
+    batch_id / batch_name of the requesting student's batch, read from
+    Course.objects.with_enrolled_batch(user) annotations.
+    """
+    def get_batch_id(self, obj):
+        return getattr(obj, 'enrolled_batch_id', None)
+
+    def get_batch_name(self, obj):
+        return getattr(obj, 'enrolled_batch_name', None)
+
+
+class CourseListSerializer(EnrolledBatchSerializerMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for listing courses (used in list API).
     """
@@ -45,23 +57,8 @@ class CourseListSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['course_code', 'created_at', 'total_weeks']
 
-    def get_batch_id(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return None
-        # Find the batch the student is enrolled in for this course
-        batch = obj.batches.filter(enrollments__student=user).first()
-        return batch.id if batch else None
 
-    def get_batch_name(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return None
-        batch = obj.batches.filter(enrollments__student=user).first()
-        return batch.name if batch else None
-
-
-class CourseDetailSerializer(serializers.ModelSerializer):
+class CourseDetailSerializer(EnrolledBatchSerializerMixin, serializers.ModelSerializer):
     """
     Detailed serializer for a single course (used in retrieve/create/update).
     """
@@ -95,20 +92,6 @@ class CourseDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['course_code', 'created_by', 'updated_by', 'created_at', 'updated_at', 'total_weeks']
 
-    def get_batch_id(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return None
-        batch = obj.batches.filter(enrollments__student=user).first()
-        return batch.id if batch else None
-
-    def get_batch_name(self, obj):
-        user = self.context['request'].user
-        if not user.is_authenticated:
-            return None
-        batch = obj.batches.filter(enrollments__student=user).first()
-        return batch.name if batch else None
-
 
 class CourseCreateUpdateSerializer(serializers.ModelSerializer):
     """
@@ -1,5 +1,8 @@
 import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from django.db import transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
@@ -7,47 +10,289 @@ from apps.courses.models import (
     Batch, BatchWeek, BatchClassSession, CourseClassSession, CourseWeek,
     CourseWeeklyTest, CourseTestQuestion,
     BatchWeeklyTest, BatchTestQuestion, BatchTestQuestionAttachment,
+    PostSessionQuestion, StudentSessionView, TestSubmission,
+    UploadSession, StoredObject, StorageDeletion, CloneJob, TimelineExtension,
+    count_subquery,
 )
-from apps.courses.views.upload_views import get_s3_client
+from utils.ordering import key_between, keys_between
+from utils.storage import get_s3_client
 
 logger = logging.getLogger(__name__)
 
-def initialize_batch_weeks(batch):
+CLONE_BULK_BATCH_SIZE = 500
+
+
+def week_unlock_date(start_date, week_number):
+    """Midnight on the first day of `week_number`, counting `start_date` as week 1."""
+    return timezone.make_aware(
+        timezone.datetime.combine(start_date + timedelta(days=(week_number - 1) * 7), timezone.datetime.min.time())
+    )
+
+def load_course_content_tree(course_id, published_only=False):
+    """
+    Course weeks with their whole content tree prefetched for
+    CourseWeekSerializer: sessions, their MCQs and choices, and the weekly
+    test with its questions and attachments. One query per level, however
+    many weeks, sessions or questions the course has.
+    """
+    weeks = CourseWeek.objects.filter(course_id=course_id).select_related('weekly_test')
+    if published_only:
+        weeks = weeks.filter(is_published=True)
+    return weeks.prefetch_related(
+        Prefetch(
+            'class_sessions',
+            queryset=CourseClassSession.objects.order_by('position', 'id').prefetch_related(
+                Prefetch('mcq_questions', queryset=PostSessionQuestion.objects.prefetch_related('choices'))
+            ),
+        ),
+        Prefetch(
+            'weekly_test__questions',
+            queryset=CourseTestQuestion.objects.prefetch_related('attachments'),
+        ),
+    )
+
+def load_batch_content_tree(batch_id, published_only=False):
+    """
+    Batch weeks with their whole content tree prefetched for
+    BatchWeekSerializer: sessions with the course rows they inherit from,
+    and the weekly test with its questions and attachments. One query per
+    level, however many weeks, sessions or questions the batch has.
+    """
+    weeks = (
+        BatchWeek.objects.filter(batch_id=batch_id).order_by('week_number')
+        .select_related('source_week', 'weekly_test')
+    )
+    if published_only:
+        weeks = weeks.filter(is_published=True)
+    return weeks.prefetch_related(
+        Prefetch(
+            'class_sessions',
+            queryset=BatchClassSession.objects.select_related('source_session').order_by('position', 'id'),
+        ),
+        Prefetch(
+            'weekly_test__questions',
+            queryset=BatchTestQuestion.objects.prefetch_related('attachments'),
+        ),
+    )
+
+def batch_content_etag(batch_id, published_only=False):
+    """
+    Validator for the batch content tree, or None when the batch does not
+    exist. Besides `content_version` it covers what changes without a write:
+    weeks unlocking over time, and the presigned URL window, so a cached
+    tree never outlives the links inside it. One query.
+    """
+    now = timezone.now()
+    state = (
+        Batch.objects.filter(pk=batch_id)
+        .annotate(weeks_unlocked=count_subquery(
+            BatchWeek.objects.filter(Q(unlock_date__isnull=True) | Q(unlock_date__lte=now))
+        ))
+        .values_list('content_version', 'weeks_unlocked')
+        .first()
+    )
+    if state is None:
+        return None
+    content_version, weeks_unlocked = state
+    url_window = int(now.timestamp()) // settings.PRESIGNED_URL_BUCKET_SECONDS
+    audience = 'published' if published_only else 'all'
+    return f'"batch-{batch_id}-v{content_version}-u{weeks_unlocked}-w{url_window}-{audience}"'
+
+def load_enrollment_progress(enrollments):
+    """
+    Progress metrics for a page of enrollments, keyed by enrollment id, as
+    rendered by BatchEnrollmentSerializer. Three grouped queries whatever the
+    page size: the week structure of the batches involved, completed session
+    views per (enrollment, week) and test submissions per (enrollment, test).
+    The rest is merged in memory.
+
+    A week counts as completed once every session in it is marked complete
+    and its weekly test (if any) has a submission. Marks are the best
+    published result per test, out of the summed marks of its questions.
+    """
+    enrollments = list(enrollments)
+    enrollment_ids = [enrollment.id for enrollment in enrollments]
+    batch_ids = {enrollment.batch_id for enrollment in enrollments}
+
+    # A subquery rather than a join: joining the questions would fan out the session counts
+    test_marks = (
+        BatchTestQuestion.objects.filter(test_id=OuterRef('weekly_test__id'))
+        .values('test_id')
+        .annotate(total=Sum('marks'))
+        .values('total')
+    )
+    weeks_by_batch = {batch_id: {} for batch_id in batch_ids}
+    for week in (
+        BatchWeek.objects.filter(batch_id__in=batch_ids)
+        .values('id', 'batch_id', 'weekly_test__id')
+        .annotate(
+            test_marks=Subquery(test_marks),
+            sessions=Count('class_sessions', distinct=True),
+            quizzes=Count(
+                'class_sessions', distinct=True,
+                filter=Q(class_sessions__source_session__mcq_questions__isnull=False),
+            ),
+        )
+    ):
+        weeks_by_batch[week['batch_id']][week['id']] = week
+
+    completed = defaultdict(Counter)
+    for row in (
+        StudentSessionView.objects.filter(
+            enrollment_id__in=enrollment_ids, is_completed=True,
+            batch_session__batch_week__batch_id=F('enrollment__batch_id'),
+        )
+        .values('enrollment_id', 'batch_session__batch_week_id')
+        .annotate(done=Count('id'))
+    ):
+        completed[row['enrollment_id']][row['batch_session__batch_week_id']] = row['done']
+
+    best_marks = defaultdict(dict)
+    for row in (
+        TestSubmission.objects.filter(
+            enrollment_id__in=enrollment_ids,
+            batch_weekly_test__batch_week__batch_id=F('enrollment__batch_id'),
+        )
+        .values('enrollment_id', 'batch_weekly_test_id')
+        .annotate(best=Max('marks_obtained', filter=Q(status=TestSubmission.Status.PUBLISHED)))
+    ):
+        best_marks[row['enrollment_id']][row['batch_weekly_test_id']] = row['best']
+
+    progress = {}
+    for enrollment in enrollments:
+        weeks = weeks_by_batch[enrollment.batch_id].values()
+        test_marks = {week['weekly_test__id']: week['test_marks'] or 0 for week in weeks}
+        done = completed[enrollment.id]
+        submitted = best_marks[enrollment.id]
+        graded = {test_id: marks for test_id, marks in submitted.items() if marks is not None}
+
+        total_sessions = sum(week['sessions'] for week in weeks)
+        total_tests = sum(1 for week in weeks if week['weekly_test__id'])
+        sessions_done = sum(min(done[week['id']], week['sessions']) for week in weeks)
+        total_items = total_sessions + total_tests
+        progress[enrollment.id] = {
+            'overall_progress': round((sessions_done + len(submitted)) * 100 / total_items, 1) if total_items else 0.0,
+            'weeks_completed': sum(
+                1 for week in weeks
+                if (week['sessions'] or week['weekly_test__id'])
+                and done[week['id']] >= week['sessions']
+                and (not week['weekly_test__id'] or week['weekly_test__id'] in submitted)
+            ),
+            'total_weeks': len(weeks),
+            'weekly_tests_submitted': len(submitted),
+            'total_weekly_tests': total_tests,
+            # Post-session MCQ answers are not recorded per student yet
+            'quizzes_done': 0,
+            'total_quizzes': sum(week['quizzes'] for week in weeks),
+            'marks_obtained': round(sum(graded.values()), 1),
+            'total_marks': round(sum(test_marks.get(test_id, 0) for test_id in graded), 1),
+        }
+    return progress
+
+def initialize_batch_weeks(batch, link_to_course=None):
     """
     Initializes BatchWeeks based on CourseWeeks of the related course.
     Calculates unlock dates based on batch start_date.
+
+    All missing weeks are inserted with one bulk_create(ignore_conflicts=True),
+    so concurrent calls never fail on the (batch, week_number) constraint.
+    Returns the BatchWeek rows created by this call, ordered by week_number,
+    so callers can chain session cloning onto them.
     """
     if not batch.start_date or not batch.course:
-        return
+        return []
 
-    course_weeks = CourseWeek.objects.filter(course=batch.course).order_by('week_number')
-    
+    if link_to_course is None:
+        link_to_course = settings.BATCH_CONTENT_COPY_ON_WRITE
+
+    existing = set(BatchWeek.objects.filter(batch=batch).values_list('week_number', flat=True))
+    course_weeks = CourseWeek.objects.filter(course=batch.course).exclude(week_number__in=existing).order_by('week_number')
+
+    new_weeks = []
     for cw in course_weeks:
-        # Calculate Monday of that week
-        # Assuming start_date is the start of Week 1
-        # If start_date is Monday, Week 2 unlock is start_date + 7 days
-        days_to_add = (cw.week_number - 1) * 7
-        unlock_date = timezone.make_aware(
-            timezone.datetime.combine(batch.start_date + timedelta(days=days_to_add), timezone.datetime.min.time())
-        )
-        
-        BatchWeek.objects.get_or_create(
+        bw = BatchWeek(
             batch=batch,
             week_number=cw.week_number,
-            defaults={
-                'title': cw.title,
-                'description': cw.description,
-                'unlock_date': unlock_date,
-                'is_published': cw.is_published
-            }
+            unlock_date=week_unlock_date(batch.start_date, cw.week_number),
+            is_published=cw.is_published,
         )
+        if link_to_course:
+            bw.source_week, bw.inherits_content = cw, True
+        else:
+            bw.title, bw.description = cw.title, cw.description
+        new_weeks.append(bw)
+    if not new_weeks:
+        return []
+
+    BatchWeek.objects.bulk_create(new_weeks, ignore_conflicts=True, batch_size=CLONE_BULK_BATCH_SIZE)
+    Batch.objects.filter(pk=batch.pk).bump_content_version()
+    # ignore_conflicts leaves primary keys unset, so read the rows back
+    return list(
+        BatchWeek.objects.filter(batch=batch, week_number__in=[bw.week_number for bw in new_weeks])
+        .order_by('week_number')
+    )
+
+def session_origin(session):
+    """ID of the course session a course or batch session is (or was copied from)."""
+    if isinstance(session, CourseClassSession):
+        return session.id
+    return session.source_session_id
+
+def group_sessions(sessions):
+    """Groups sessions of one week by weekday, each list in display order."""
+    groups = defaultdict(list)
+    for session in sorted(sessions, key=lambda s: (s.position, s.id)):
+        groups[session.weekday].append(session)
+    return groups
+
+def match_sessions(sources, targets):
+    """
+    Pairs the source sessions of one week and weekday with the batch sessions
+    they were pushed to (both lists in display order). Every pushed session
+    records the course session it comes from in `source_session`, so sources
+    with a course origin are matched on that; sources without one (sessions
+    a batch added itself) are matched by rank against the batch sessions
+    without one. Order keys are never compared: they are local to each list.
+
+    Returns (pairs, unmatched sources in display order).
+    """
+    linked = {t.source_session_id: t for t in targets if t.source_session_id}
+    pairs, by_rank = [], []
+    for source in sources:
+        origin = session_origin(source)
+        if origin is None:
+            by_rank.append(source)
+        elif origin in linked:
+            pairs.append((source, linked.pop(origin)))
+    pairs.extend(zip(by_rank, [t for t in targets if not t.source_session_id]))
+    matched = {id(source) for source, _ in pairs}
+    return pairs, [source for source in sources if id(source) not in matched]
 
 @transaction.atomic
-def push_content_to_batch(source_batch_id=None, source_course_id=None, target_batch_id=None):
+def push_content_to_batch(source_batch_id=None, source_course_id=None, target_batch_id=None,
+                          week_numbers=None, link_to_course=None):
     """
     Clones content from a source (Course or Batch) to a target Batch.
+
+    Set-based: the source tree is loaded with a fixed number of prefetch
+    queries, the target's existing rows are read once per model, and only the
+    missing weeks / sessions / tests / questions / attachments are written
+    with one bulk_create per model. Existing target rows are left untouched,
+    so the push is idempotent and can be run in slices of `week_numbers`.
+
+    With `link_to_course` (default: BATCH_CONTENT_COPY_ON_WRITE) weeks and
+    sessions pushed from a course are created as copy-on-write links that
+    read their content from the course rows until edited. Rows cloned from a
+    batch keep the source row's link if it still has one. Sessions are
+    matched with match_sessions(); missing ones are appended after the
+    batch's own sessions of that weekday and record their course origin.
+
+    Returns a dict of source rows processed (weeks, sessions, questions),
+    or False if no source was given.
     """
-    target_batch = Batch.objects.get(id=target_batch_id)
+    # Serializes concurrent pushes into the same batch (e.g. a reclaimed clone
+    # job next to a worker that is still alive): each sees the other's rows
+    target_batch = Batch.objects.select_for_update().get(id=target_batch_id)
     
     if source_batch_id:
         source_batch = Batch.objects.get(id=source_batch_id)
@@ -61,113 +306,980 @@ def push_content_to_batch(source_batch_id=None, source_course_id=None, target_ba
     else:
         return False
 
+    if week_numbers is not None:
+        source_weeks = source_weeks.filter(week_number__in=week_numbers)
+
+    if link_to_course is None:
+        link_to_course = settings.BATCH_CONTENT_COPY_ON_WRITE
+    from_course = not source_batch_id
+
+    def course_link(row, source_field):
+        """ID of the course row a new batch row should inherit from, or None to copy."""
+        if from_course:
+            return row.id if link_to_course else None
+        return getattr(row, f'{source_field}_id') if row.inherits_content else None
+
+    def content(row, name):
+        """Field value of a source row, resolved through inheritance for batch rows."""
+        return getattr(row, name) if from_course else row.get_content(name)
+
+    source_weeks = list(
+        source_weeks.order_by('week_number')
+        .select_related('weekly_test')
+        .prefetch_related('class_sessions', 'weekly_test__questions__attachments')
+    )
+
+    # 1. Weeks (matched on week_number)
+    target_weeks = {bw.week_number: bw for bw in BatchWeek.objects.filter(batch=target_batch)}
+    new_weeks = []
     for sw in source_weeks:
-        # 1. Create/Update BatchWeek
-        days_to_add = (sw.week_number - 1) * 7
-        unlock_date = timezone.make_aware(
-            timezone.datetime.combine(target_batch.start_date + timedelta(days=days_to_add), timezone.datetime.min.time())
-        )
-        
-        bw, created = BatchWeek.objects.get_or_create(
+        if sw.week_number in target_weeks:
+            continue
+        bw = BatchWeek(
             batch=target_batch,
             week_number=sw.week_number,
-            defaults={
-                'title': sw.title,
-                'description': sw.description,
-                'unlock_date': unlock_date,
-                'is_published': sw.is_published
-            }
+            unlock_date=week_unlock_date(target_batch.start_date, sw.week_number),
+            is_published=sw.is_published,
         )
+        source_week_id = course_link(sw, 'source_week')
+        if source_week_id:
+            bw.source_week_id, bw.inherits_content = source_week_id, True
+        else:
+            bw.title, bw.description = content(sw, 'title'), content(sw, 'description')
+        new_weeks.append(bw)
+    for bw in BatchWeek.objects.bulk_create(new_weeks, batch_size=CLONE_BULK_BATCH_SIZE):
+        target_weeks[bw.week_number] = bw
+
+    week_ids = [bw.id for bw in target_weeks.values()]
 
-        # 2. Clone ClassSessions (from CourseClassSession → BatchClassSession)
-        source_sessions = sw.class_sessions.all()
-        for ss in source_sessions:
-            # Check if session already exists in target batch week
-            if not BatchClassSession.objects.filter(batch_week=bw, session_number=ss.session_number).exists():
-                BatchClassSession.objects.create(
+    # 2. ClassSessions (matched per weekday on their course session, else on rank)
+    target_sessions = defaultdict(list)
+    for bs in BatchClassSession.objects.filter(batch_week_id__in=week_ids).order_by('position', 'id'):
+        target_sessions[(bs.batch_week_id, bs.weekday)].append(bs)
+    new_sessions = []
+    for sw in source_weeks:
+        bw = target_weeks[sw.week_number]
+        for weekday, group in group_sessions(sw.class_sessions.all()).items():
+            existing = target_sessions[(bw.id, weekday)]
+            _, missing = match_sessions(group, existing)
+            last_key = existing[-1].position if existing else None
+            for ss, position in zip(missing, keys_between(last_key, None, len(missing))):
+                bs = BatchClassSession(
                     batch_week=bw,
-                    session_number=ss.session_number,
-                    title=ss.title,
-                    description=ss.description,
-                    video_file=ss.video_file,
-                    thumbnail=ss.thumbnail,
-                    duration_seconds=ss.duration_seconds,
-                    uploaded_by=ss.uploaded_by
+                    position=position,
+                    weekday=weekday,
+                    uploaded_by_id=ss.uploaded_by_id,
+                    source_session_id=session_origin(ss),
                 )
+                if course_link(ss, 'source_session'):
+                    # Thin row: content (and the video reference) stays on the course session
+                    bs.inherits_content = True
+                else:
+                    for name in BatchClassSession.INHERITED_FIELDS:
+                        setattr(bs, name, content(ss, name))
+                new_sessions.append(bs)
+    BatchClassSession.objects.bulk_create(new_sessions, batch_size=CLONE_BULK_BATCH_SIZE)
+    # bulk_create skips the post_save signal, so add the video references here
+    StoredObject.objects.retain(session.video_file for session in new_sessions)
 
-        # 3. Clone WeeklyTest → independent BatchWeeklyTest
-        if hasattr(sw, 'weekly_test') and sw.weekly_test:
-            st = sw.weekly_test  # CourseWeeklyTest (or BatchWeeklyTest if cloning from batch)
-            tt, created = BatchWeeklyTest.objects.get_or_create(
+    # 3. WeeklyTest → independent BatchWeeklyTest (one per week)
+    target_tests = {
+        bt.batch_week_id: bt for bt in BatchWeeklyTest.objects.filter(batch_week_id__in=week_ids)
+    }
+    source_tests = []
+    new_tests = []
+    for sw in source_weeks:
+        st = getattr(sw, 'weekly_test', None)
+        if not st:
+            continue
+        bw = target_weeks[sw.week_number]
+        source_tests.append((st, bw.id))
+        if bw.id not in target_tests:
+            new_tests.append(BatchWeeklyTest(
                 batch_week=bw,
-                defaults={
-                    'title': st.title,
-                    'instructions': st.instructions,
-                    'pass_percentage': st.pass_percentage,
-                    'created_by': st.created_by
-                }
-            )
+                title=st.title,
+                instructions=st.instructions,
+                pass_percentage=st.pass_percentage,
+                created_by_id=st.created_by_id,
+            ))
+    for bt in BatchWeeklyTest.objects.bulk_create(new_tests, batch_size=CLONE_BULK_BATCH_SIZE):
+        target_tests[bt.batch_week_id] = bt
+
+    # 4. Questions (matched on order) + attachments of newly created questions
+    existing_orders = set(
+        BatchTestQuestion.objects.filter(test_id__in=[bt.id for bt in target_tests.values()])
+        .values_list('test_id', 'order')
+    )
+    new_questions = []
+    question_sources = []
+    for st, batch_week_id in source_tests:
+        bt = target_tests[batch_week_id]
+        for sq in st.questions.all():
+            if (bt.id, sq.order) in existing_orders:
+                continue
+            existing_orders.add((bt.id, sq.order))
+            new_questions.append(BatchTestQuestion(
+                test=bt,
+                order=sq.order,
+                text=sq.text,
+                question_file=sq.question_file,
+                image=sq.image,
+                marks=sq.marks,
+            ))
+            question_sources.append(sq)
+    BatchTestQuestion.objects.bulk_create(new_questions, batch_size=CLONE_BULK_BATCH_SIZE)
+
+    BatchTestQuestionAttachment.objects.bulk_create(
+        [
+            BatchTestQuestionAttachment(question=bq, file=attachment.file, name=attachment.name)
+            for bq, sq in zip(new_questions, question_sources)
+            for attachment in sq.attachments.all()
+        ],
+        batch_size=CLONE_BULK_BATCH_SIZE
+    )
+    # bulk_create skips the post_save receivers that bump the version
+    Batch.objects.filter(pk=target_batch.pk).bump_content_version()
+
+    return {
+        'weeks': len(source_weeks),
+        'sessions': sum(len(sw.class_sessions.all()) for sw in source_weeks),
+        'questions': sum(len(st.questions.all()) for st, _ in source_tests),
+    }
+
+SYNC_WEEK_FIELDS     = ['title', 'description', 'is_published']
+SYNC_SESSION_FIELDS  = ['title', 'description', 'video_file', 'thumbnail', 'duration_seconds']
+SYNC_TEST_FIELDS     = ['title', 'instructions', 'pass_percentage']
+SYNC_QUESTION_FIELDS = ['text', 'question_file', 'image', 'marks']
+
+
+def _bulk_update_synced(model, rows, fields):
+    """bulk_update skips auto_now, so stamp updated_at on models that have it."""
+    if any(field.name == 'updated_at' for field in model._meta.fields):
+        now = timezone.now()
+        for row in rows:
+            row.updated_at = now
+        fields = fields + ['updated_at']
+    model.objects.bulk_update(rows, fields, batch_size=CLONE_BULK_BATCH_SIZE)
+
+def _copy_fields(source, target, fields):
+    """Copies `fields` from source to target; returns True if anything changed."""
+    changed = False
+    for field in fields:
+        value = getattr(source, field)
+        if getattr(target, field) != value:
+            setattr(target, field, value)
+            changed = True
+    return changed
+
+@transaction.atomic
+def sync_course_content_to_batches(course_id, batch_ids=None, link_to_course=None):
+    """
+    Pushes course content edited since each batch's `content_synced_at`
+    watermark to all batches of the course in one bulk pass.
+
+    Changed CourseWeek / CourseClassSession / CourseWeeklyTest /
+    CourseTestQuestion rows are read once (updated_at > oldest watermark),
+    the matching batch rows of every batch are read once per model, and
+    writes go out as one bulk_update / bulk_create per model. Batch rows are
+    matched on week_number, match_sessions() and question order; source rows
+    missing from a batch are created, as copy-on-write links or copies like
+    push_content_to_batch does (`link_to_course`, default:
+    BATCH_CONTENT_COPY_ON_WRITE). Copy-on-write rows that still inherit from
+    the course are skipped (they already read it), and so are batch rows
+    whose content was edited after the course row (`content_edited_at`; the
+    newer edit wins).
+    Deleted course rows and question attachments are not synced.
+
+    The new watermark is the sync's start time minus
+    COURSE_SYNC_WATERMARK_MARGIN_SECONDS rather than the newest updated_at
+    read: a course row saved just before the sync but committed after it has
+    an older updated_at and would otherwise be skipped for good.
+
+    Returns a summary dict (batches, weeks, sessions, tests, questions)
+    counting batch rows written.
+    """
+    batches = Batch.objects.select_for_update().filter(course_id=course_id)
+    if batch_ids is not None:
+        batches = batches.filter(id__in=batch_ids)
+    batches = list(batches)
+    summary = {'batches': len(batches), 'weeks': 0, 'sessions': 0, 'tests': 0, 'questions': 0}
+    if not batches:
+        return summary
+
+    if link_to_course is None:
+        link_to_course = settings.BATCH_CONTENT_COPY_ON_WRITE
+    new_watermark = timezone.now() - timedelta(seconds=settings.COURSE_SYNC_WATERMARK_MARGIN_SECONDS)
+    watermarks = {b.id: b.content_synced_at for b in batches}
+    since = None if None in watermarks.values() else min(watermarks.values())
+
+    def changed(queryset):
+        return list(queryset if since is None else queryset.filter(updated_at__gt=since))
+
+    src_weeks = changed(CourseWeek.objects.filter(course_id=course_id))
+    src_sessions = changed(
+        CourseClassSession.objects.filter(course_week__course_id=course_id).select_related('course_week')
+    )
+    src_tests = changed(
+        CourseWeeklyTest.objects.filter(course_week__course_id=course_id).select_related('course_week')
+    )
+    src_questions = changed(
+        CourseTestQuestion.objects.filter(test__course_week__course_id=course_id).select_related('test__course_week')
+    )
+    all_changed = src_weeks + src_sessions + src_tests + src_questions
+    if not all_changed:
+        return summary
+
+    def applies(row, batch):
+        watermark = watermarks[batch.id]
+        return watermark is None or row.updated_at > watermark
 
-            # Clone Questions + their supporting attachments into batch
-            for sq in st.questions.all():
-                bq, q_created = BatchTestQuestion.objects.get_or_create(
-                    test=tt,
-                    order=sq.order,
-                    defaults={
-                        'text': sq.text,
-                        'question_file': sq.question_file,
-                        'image': sq.image,
-                        'marks': sq.marks,
-                    }
+    def edited_in_batch(source, target):
+        return target.content_edited_at > source.updated_at
+
+    batch_ids = [b.id for b in batches]
+
+    # 1. Weeks
+    weeks = {
+        (bw.batch_id, bw.week_number): bw
+        for bw in BatchWeek.objects.filter(batch_id__in=batch_ids)
+    }
+    week_updates, week_creates = [], []
+    for sw in src_weeks:
+        for batch in batches:
+            if not applies(sw, batch):
+                continue
+            bw = weeks.get((batch.id, sw.week_number))
+            if bw is None:
+                bw = BatchWeek(
+                    batch=batch,
+                    week_number=sw.week_number,
+                    unlock_date=week_unlock_date(batch.start_date, sw.week_number),
                 )
+                if link_to_course:
+                    bw.source_week, bw.inherits_content = sw, True
+                    bw.is_published = sw.is_published
+                else:
+                    _copy_fields(sw, bw, SYNC_WEEK_FIELDS)
+                week_creates.append(bw)
+                weeks[(batch.id, sw.week_number)] = bw
+            elif edited_in_batch(sw, bw):
+                continue
+            elif bw.inherits_content:
+                # Copy-on-write link: already reads the course row
+                if bw.is_published != sw.is_published:
+                    bw.is_published = sw.is_published
+                    week_updates.append(bw)
+            elif _copy_fields(sw, bw, SYNC_WEEK_FIELDS):
+                week_updates.append(bw)
+    BatchWeek.objects.bulk_create(week_creates, batch_size=CLONE_BULK_BATCH_SIZE)
+    _bulk_update_synced(BatchWeek, week_updates, SYNC_WEEK_FIELDS)
+    summary['weeks'] = len(week_creates) + len(week_updates)
+
+    # 2. ClassSessions (ranks need the whole weekday list of every changed session)
+    changed_lists = {(ss.course_week_id, ss.weekday) for ss in src_sessions}
+    changed_ids = {ss.id for ss in src_sessions}
+    course_lists = defaultdict(list)
+    for ss in (
+        CourseClassSession.objects.filter(course_week_id__in={week_id for week_id, _ in changed_lists})
+        .select_related('course_week').order_by('position', 'id')
+    ):
+        if (ss.course_week_id, ss.weekday) in changed_lists:
+            course_lists[(ss.course_week.week_number, ss.weekday)].append(ss)
+    batch_lists = defaultdict(list)
+    for bs in (
+        BatchClassSession.objects.filter(batch_week__batch_id__in=batch_ids)
+        .select_related('batch_week').order_by('position', 'id')
+    ):
+        batch_lists[(bs.batch_week.batch_id, bs.batch_week.week_number, bs.weekday)].append(bs)
+
+    session_updates, session_creates, released, retained = [], [], [], []
+    for (week_number, weekday), group in course_lists.items():
+        for batch in batches:
+            bw = weeks.get((batch.id, week_number))
+            if bw is None:
+                continue
+            existing = batch_lists[(batch.id, week_number, weekday)]
+            pairs, missing = match_sessions(group, existing)
+            missing = [ss for ss in missing if ss.id in changed_ids and applies(ss, batch)]
+            last_key = existing[-1].position if existing else None
+            for ss, position in zip(missing, keys_between(last_key, None, len(missing))):
+                bs = BatchClassSession(
+                    batch_week=bw, weekday=weekday, position=position,
+                    uploaded_by_id=ss.uploaded_by_id, source_session_id=ss.id,
+                )
+                if link_to_course:
+                    # Thin row: content (and the video reference) stays on the course session
+                    bs.inherits_content = True
+                else:
+                    _copy_fields(ss, bs, SYNC_SESSION_FIELDS)
+                    retained.append(bs.video_file)
+                session_creates.append(bs)
+            for ss, bs in pairs:
+                if ss.id not in changed_ids or not applies(ss, batch):
+                    continue
+                if bs.inherits_content or edited_in_batch(ss, bs):
+                    continue
+                previous_video = bs.video_file
+                if _copy_fields(ss, bs, SYNC_SESSION_FIELDS):
+                    session_updates.append(bs)
+                    if previous_video != bs.video_file:
+                        released.append(previous_video)
+                        retained.append(bs.video_file)
+    BatchClassSession.objects.bulk_create(session_creates, batch_size=CLONE_BULK_BATCH_SIZE)
+    _bulk_update_synced(BatchClassSession, session_updates, SYNC_SESSION_FIELDS)
+    # bulk writes skip the session signals, so move the video references here
+    StoredObject.objects.retain(retained)
+    StoredObject.objects.release(released)
+    StorageDeletion.objects.enqueue(released)
+    summary['sessions'] = len(session_creates) + len(session_updates)
+
+    # 3. WeeklyTests
+    tests = {
+        (bt.batch_week.batch_id, bt.batch_week.week_number): bt
+        for bt in BatchWeeklyTest.objects.filter(batch_week__batch_id__in=batch_ids).select_related('batch_week')
+    }
+    test_updates, test_creates = [], []
+    for st in src_tests:
+        week_number = st.course_week.week_number
+        for batch in batches:
+            bw = weeks.get((batch.id, week_number))
+            if bw is None or not applies(st, batch):
+                continue
+            bt = tests.get((batch.id, week_number))
+            if bt is None:
+                bt = BatchWeeklyTest(batch_week=bw, created_by_id=st.created_by_id)
+                _copy_fields(st, bt, SYNC_TEST_FIELDS)
+                test_creates.append(bt)
+                tests[(batch.id, week_number)] = bt
+            elif edited_in_batch(st, bt):
+                continue
+            elif _copy_fields(st, bt, SYNC_TEST_FIELDS):
+                test_updates.append(bt)
+    BatchWeeklyTest.objects.bulk_create(test_creates, batch_size=CLONE_BULK_BATCH_SIZE)
+    _bulk_update_synced(BatchWeeklyTest, test_updates, SYNC_TEST_FIELDS)
+    summary['tests'] = len(test_creates) + len(test_updates)
+
+    # 4. Questions
+    questions = {
+        (bq.test.batch_week.batch_id, bq.test.batch_week.week_number, bq.order): bq
+        for bq in BatchTestQuestion.objects.filter(test__batch_week__batch_id__in=batch_ids).select_related('test__batch_week')
+    }
+    question_updates, question_creates = [], []
+    for sq in src_questions:
+        week_number = sq.test.course_week.week_number
+        for batch in batches:
+            bt = tests.get((batch.id, week_number))
+            if bt is None or not applies(sq, batch):
+                continue
+            bq = questions.get((batch.id, week_number, sq.order))
+            if bq is None:
+                bq = BatchTestQuestion(test=bt, order=sq.order)
+                _copy_fields(sq, bq, SYNC_QUESTION_FIELDS)
+                question_creates.append(bq)
+                questions[(batch.id, week_number, sq.order)] = bq
+            elif edited_in_batch(sq, bq):
+                continue
+            elif _copy_fields(sq, bq, SYNC_QUESTION_FIELDS):
+                question_updates.append(bq)
+    BatchTestQuestion.objects.bulk_create(question_creates, batch_size=CLONE_BULK_BATCH_SIZE)
+    _bulk_update_synced(BatchTestQuestion, question_updates, SYNC_QUESTION_FIELDS)
+    summary['questions'] = len(question_creates) + len(question_updates)
 
-                # Clone attachments only if the question was just created
-                if q_created:
-                    for attachment in sq.attachments.all():
-                        BatchTestQuestionAttachment.objects.create(
-                            question=bq,
-                            file=attachment.file,
-                            name=attachment.name,
-                        )
+    Batch.objects.filter(id__in=batch_ids).update(
+        content_synced_at=new_watermark, content_version=F('content_version') + 1
+    )
+    return summary
 
-    return True
+ACTIVE_CLONE_JOB_STATUSES = (CloneJob.Status.QUEUED, CloneJob.Status.RUNNING)
 
-def extend_batch_timeline(batch_id, days):
+@transaction.atomic
+def create_clone_job(target_batch_id, source_course_id=None, source_batch_id=None, requested_by=None):
+    """
+    Validates a push request and queues it as a CloneJob for the worker.
+    While a job for the batch is already queued or running, that job is
+    returned instead of queueing another one.
+    Raises ValueError for invalid sources (same rules as push_content_to_batch).
+    """
+    target_batch = Batch.objects.select_for_update().get(id=target_batch_id)
+    active = CloneJob.objects.filter(target_batch=target_batch, status__in=ACTIVE_CLONE_JOB_STATUSES).first()
+    if active is not None:
+        return active
+
+    if source_batch_id:
+        source_batch = Batch.objects.get(id=source_batch_id)
+        if source_batch.course_id != target_batch.course_id:
+            raise ValueError("Source batch must belong to the same course as target batch.")
+        total_weeks = BatchWeek.objects.filter(batch_id=source_batch_id).count()
+    elif source_course_id:
+        if int(source_course_id) != target_batch.course_id:
+            raise ValueError("Source course must be the same as target batch course.")
+        total_weeks = CourseWeek.objects.filter(course_id=source_course_id).count()
+    else:
+        raise ValueError("Missing source source_course_id or source_batch_id")
+
+    return CloneJob.objects.create(
+        target_batch=target_batch,
+        source_course_id=source_course_id or None,
+        source_batch_id=source_batch_id or None,
+        requested_by=requested_by,
+        total_weeks=total_weeks,
+    )
+
+def claim_next_clone_job():
+    """
+    Marks the oldest claimable job as running and returns it (None if there is
+    nothing to do). Claimable means QUEUED, or RUNNING with a heartbeat older
+    than CLONE_JOB_STALE_SECONDS - i.e. its worker died mid-run.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.CLONE_JOB_STALE_SECONDS)
+    with transaction.atomic():
+        job = (
+            CloneJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=CloneJob.Status.QUEUED)
+                | Q(status=CloneJob.Status.RUNNING, heartbeat_at__lt=stale_before)
+                | Q(status=CloneJob.Status.RUNNING, heartbeat_at__isnull=True, started_at__lt=stale_before)
+            )
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        if job.status == CloneJob.Status.RUNNING:
+            logger.warning(f"Reclaiming clone job {job.id}: no heartbeat since {job.heartbeat_at}")
+        now = timezone.now()
+        job.status = CloneJob.Status.RUNNING
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+    return job
+
+@transaction.atomic
+def requeue_clone_job(job):
+    """
+    Puts a FAILED job back on the queue. The rerun continues where the failed
+    one stopped because push_content_to_batch only adds missing rows.
+    Raises ValueError for jobs in any other state, or while another job for
+    the same batch is queued or running.
+    """
+    list(Batch.objects.select_for_update().filter(pk=job.target_batch_id).values_list('pk', flat=True))
+    if CloneJob.objects.filter(target_batch_id=job.target_batch_id, status__in=ACTIVE_CLONE_JOB_STATUSES).exists():
+        raise ValueError("Another clone job for this batch is already queued or running.")
+    updated = CloneJob.objects.filter(pk=job.pk, status=CloneJob.Status.FAILED).update(
+        status=CloneJob.Status.QUEUED, error='',
+        started_at=None, heartbeat_at=None, finished_at=None,
+    )
+    if not updated:
+        raise ValueError("Only failed clone jobs can be re-queued.")
+    job.refresh_from_db()
+    return job
+
+def run_clone_job(job, weeks_per_step=None):
+    """
+    Runs a claimed CloneJob in slices of `weeks_per_step` weeks. Each slice is
+    its own transaction, so progress is committed (and visible to pollers) as
+    it goes, and the heartbeat is bumped with it. A re-queued or reclaimed job
+    simply continues where it left off because push_content_to_batch only adds
+    missing rows.
+    """
+    weeks_per_step = weeks_per_step or settings.CLONE_JOB_WEEKS_PER_STEP
+    if job.source_batch_id:
+        week_numbers = BatchWeek.objects.filter(batch_id=job.source_batch_id)
+    else:
+        week_numbers = CourseWeek.objects.filter(course_id=job.source_course_id)
+    week_numbers = list(week_numbers.order_by('week_number').values_list('week_number', flat=True))
+
+    job.total_weeks = len(week_numbers)
+    job.weeks_processed = job.sessions_processed = job.questions_processed = 0
+    job.save(update_fields=['total_weeks', 'weeks_processed', 'sessions_processed', 'questions_processed'])
+
+    try:
+        for start in range(0, len(week_numbers), weeks_per_step):
+            processed = push_content_to_batch(
+                source_batch_id=job.source_batch_id,
+                source_course_id=job.source_course_id,
+                target_batch_id=job.target_batch_id,
+                week_numbers=week_numbers[start:start + weeks_per_step],
+            )
+            job.weeks_processed += processed['weeks']
+            job.sessions_processed += processed['sessions']
+            job.questions_processed += processed['questions']
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['weeks_processed', 'sessions_processed', 'questions_processed', 'heartbeat_at'])
+    except Exception as e:
+        logger.error(f"Clone job {job.id} failed: {str(e)}")
+        job.status = CloneJob.Status.FAILED
+        job.error = str(e)
+    else:
+        job.status = CloneJob.Status.SUCCEEDED
+        job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+def extend_batch_timeline(batch_id, days, extended_by=None, reason=''):
     """
     Extends the timeline for all NOT YET UNLOCKED weeks of a batch.
+    Returns the TimelineExtension audit row.
+    """
+    return extend_batches_timeline([batch_id], days, extended_by=extended_by, reason=reason)[0]
+
+@transaction.atomic
+def extend_batches_timeline(batch_ids, days, extended_by=None, reason=''):
+    """
+    Pushes back every not-yet-unlocked week of the given batches by `days`
+    with a single UPDATE (unlock_date = unlock_date + interval) and writes
+    one TimelineExtension audit row per batch. Returns the audit rows.
     """
     now = timezone.now()
-    weeks_to_update = BatchWeek.objects.filter(
-        batch_id=batch_id,
-        unlock_date__gt=now
+    weeks = BatchWeek.objects.filter(batch_id__in=batch_ids, unlock_date__gt=now)
+
+    affected = {batch_id: [] for batch_id in batch_ids}
+    for batch_id, week_number in weeks.order_by('week_number').values_list('batch_id', 'week_number'):
+        affected[batch_id].append(week_number)
+
+    weeks.update(
+        unlock_date=F('unlock_date') + timedelta(days=days),
+        is_extended=True,
+        updated_at=now,
     )
-    
-    for week in weeks_to_update:
-        week.unlock_date += timedelta(days=days)
-        week.is_extended = True
-        week.save()
-    
-    return True
+    Batch.objects.filter(pk__in=batch_ids).bump_content_version()
+
+    return TimelineExtension.objects.bulk_create([
+        TimelineExtension(
+            batch_id=batch_id,
+            days=days,
+            weeks_affected=len(week_numbers),
+            week_numbers=week_numbers,
+            reason=reason,
+            extended_by=extended_by,
+        )
+        for batch_id, week_numbers in affected.items()
+    ])
+
+# Week numbers are dense (they drive the unlock schedule): rows are first
+# parked above every real number so the per-row UNIQUE checks never see two
+# rows on the same slot, then moved to their final numbers.
+RENUMBER_OFFSET = 10000
+
+# Sessions are ordered by fractional keys instead (utils.ordering); keys longer
+# than this trigger a rebalance of the list they belong to.
+POSITION_REBALANCE_LENGTH = 48
+
+# model -> (parent FK, order field, extra fields that scope the ordering)
+ORDERED_CONTENT = {
+    CourseWeek: ('course', 'week_number', ()),
+    BatchWeek: ('batch', 'week_number', ()),
+    CourseClassSession: ('course_week', 'position', ('weekday',)),
+    BatchClassSession: ('batch_week', 'position', ('weekday',)),
+}
+
+def ordering_scope(instance, **overrides):
+    """Filter kwargs selecting the rows ordered together with `instance`."""
+    parent, _, extra = ORDERED_CONTENT[type(instance)]
+    scope = {f'{parent}_id': getattr(instance, f'{parent}_id')}
+    for name in extra:
+        scope[name] = getattr(instance, name)
+    scope.update(overrides)
+    return scope
+
+def _lock_parent(model, parent_id):
+    parent_model = model._meta.get_field(ORDERED_CONTENT[model][0]).related_model
+    list(parent_model.objects.select_for_update().filter(pk=parent_id).values_list('pk', flat=True))
+
+def lock_ordering_parent(instance):
+    """
+    Takes a row lock on the week/course/batch owning `instance` so concurrent
+    reorders of the same list serialize. Must run inside a transaction.
+    """
+    model = type(instance)
+    _lock_parent(model, getattr(instance, f'{ORDERED_CONTENT[model][0]}_id'))
+
+def shift_numbers(model, scope, start, delta):
+    """Adds `delta` to the number of every row in `scope` numbered `start` or above (two UPDATEs)."""
+    field = ORDERED_CONTENT[model][1]
+    model.objects.filter(**scope, **{f'{field}__gte': start}).update(**{field: F(field) + RENUMBER_OFFSET})
+    model.objects.filter(**scope, **{f'{field}__gte': start + RENUMBER_OFFSET}).update(
+        **{field: F(field) - RENUMBER_OFFSET + delta}
+    )
+
+@transaction.atomic
+def delete_and_renumber(instance):
+    """
+    Deletes a week and closes the gap it leaves, e.g. deleting week 2 of
+    [1, 2, 3, 4] renumbers 3 -> 2 and 4 -> 3, under a lock on the parent.
+    """
+    lock_ordering_parent(instance)
+    field = ORDERED_CONTENT[type(instance)][1]
+    scope = ordering_scope(instance)
+    deleted_number = getattr(instance, field)
+    instance.delete()
+    shift_numbers(type(instance), scope, deleted_number + 1, -1)
+
+def swap_numbers(model, scope, first, second):
+    """Swaps the weeks numbered `first` and `second` in `scope`; either slot may be empty."""
+    field = ORDERED_CONTENT[model][1]
+    model.objects.filter(**scope, **{f'{field}__in': [first, second]}).update(**{field: F(field) + RENUMBER_OFFSET})
+    model.objects.filter(**scope, **{f'{field}__in': [first + RENUMBER_OFFSET, second + RENUMBER_OFFSET]}).update(
+        **{field: Case(When(**{field: first + RENUMBER_OFFSET}, then=Value(second)), default=Value(first))}
+    )
+
+def _assign_positions(model, ordered_ids):
+    """Gives the rows fresh, evenly spread order keys following `ordered_ids` (one UPDATE)."""
+    model.objects.filter(pk__in=ordered_ids).update(position=Case(
+        *[When(pk=pk, then=Value(key)) for pk, key in zip(ordered_ids, keys_between(count=len(ordered_ids)))],
+        output_field=model._meta.get_field('position'),
+    ))
+
+def backfill_session_positions(dry_run=False):
+    """
+    One-off upgrade of sessions stored before fractional ordering:
+
+    - weekday lists whose sessions still share a single order key get keys
+      from the legacy `session_number` (ties broken by id);
+    - batch lists where no session records its course origin are linked to
+      the course sessions of the same rank, which is how push and sync used
+      to match them.
+
+    Lists already upgraded are left alone. Returns a summary dict.
+    """
+    summary = {}
+    with transaction.atomic():
+        for model in (CourseClassSession, BatchClassSession):
+            week_field = f'{model.WEEK_FIELD}_id'
+            lists = (
+                model.objects.order_by().values(week_field, 'weekday')
+                .annotate(keys=Count('position', distinct=True), sessions=Count('id'))
+                .filter(keys=1, sessions__gt=1)
+            )
+            rekeyed = 0
+            for scope in lists:
+                ordered_ids = list(
+                    model.objects.filter(**{week_field: scope[week_field], 'weekday': scope['weekday']})
+                    .order_by('session_number', 'id').values_list('pk', flat=True)
+                )
+                if not dry_run:
+                    _assign_positions(model, ordered_ids)
+                rekeyed += len(ordered_ids)
+            summary[model.__name__] = rekeyed
+
+        course_lists = defaultdict(list)
+        for ss in CourseClassSession.objects.select_related('course_week').order_by('position', 'id'):
+            course_lists[(ss.course_week.course_id, ss.course_week.week_number, ss.weekday)].append(ss)
+        batch_lists = defaultdict(list)
+        for bs in BatchClassSession.objects.select_related('batch_week__batch').order_by('position', 'id'):
+            week = bs.batch_week
+            batch_lists[(week.batch.course_id, week.batch_id, week.week_number, bs.weekday)].append(bs)
+
+        linked = []
+        for (course_id, _, week_number, weekday), sessions in batch_lists.items():
+            if any(bs.source_session_id for bs in sessions):
+                continue
+            for bs, ss in zip(sessions, course_lists.get((course_id, week_number, weekday), [])):
+                bs.source_session_id = ss.id
+                linked.append(bs)
+        if not dry_run:
+            BatchClassSession.objects.bulk_update(linked, ['source_session'], batch_size=CLONE_BULK_BATCH_SIZE)
+        summary['linked'] = len(linked)
+    return summary
+
+def session_position_at(model, scope, number, exclude_id=None):
+    """
+    Returns the order key that puts a session at visible `number` (1-based)
+    in `scope` (a week and weekday), reading only its two neighbours. Pass
+    the session's own id as `exclude_id` when moving it within its list.
+    Callers hold the parent lock (lock_ordering_parent).
+    """
+    siblings = model.objects.filter(**scope).exclude(pk=exclude_id).order_by('position', 'id')
+    if number <= 1:
+        before, after = None, siblings.values_list('position', flat=True).first()
+    else:
+        neighbours = list(siblings.values_list('position', flat=True)[number - 2:number])
+        if not neighbours:
+            neighbours = [siblings.values_list('position', flat=True).last()]
+        before, after = neighbours[0], (neighbours[1] if len(neighbours) > 1 else None)
+
+    try:
+        key = key_between(before, after)
+    except ValueError:
+        # Two neighbours share a key (e.g. merged by a content push)
+        key = None
+    if key is None or len(key) > POSITION_REBALANCE_LENGTH:
+        _assign_positions(model, list(siblings.values_list('pk', flat=True)))
+        return session_position_at(model, scope, number, exclude_id)
+    return key
 
-def delete_unused_video_from_storage(video_key):
+def place_session(session, number=None, weekday=None):
     """
-    Checks if a video file key is used anywhere else in CourseClassSession or BatchClassSession.
-    If it is not used, it deletes the object from the AWS/R2 storage bucket.
+    Sets `session.position` (and weekday) so it sits at visible `number` of
+    its week's `weekday` list, appending when `number` is None. Only the
+    session itself is written when the caller saves it; siblings keep their
+    keys. Raises ValueError when `number` is out of range.
     """
-    if not video_key:
-        return
+    model = type(session)
+    weekday = weekday or session.weekday
+    scope = ordering_scope(session, weekday=weekday)
+    count = model.objects.filter(**scope).exclude(pk=session.pk).count()
+    number = count + 1 if number is None else number
+    if not 1 <= number <= count + 1:
+        raise ValueError(f"Session number must be between 1 and {count + 1} for {weekday.capitalize()}.")
+    session.weekday = weekday
+    session.position = session_position_at(model, scope, number, exclude_id=session.pk)
+    session.ordinal = number
 
-    # Check references across both models
-    is_used_in_course = CourseClassSession.objects.filter(video_file=video_key).exists()
-    is_used_in_batch = BatchClassSession.objects.filter(video_file=video_key).exists()
+@transaction.atomic
+def apply_order(model, scope, ordered_ids):
+    """
+    Reorders every row in `scope` following `ordered_ids`, which must list
+    each row exactly once. Runs in a constant number of statements whatever
+    the list size. Returns the number of rows reordered.
+    """
+    parent, field, _ = ORDERED_CONTENT[model]
+    _lock_parent(model, scope[f'{parent}_id'])
+
+    ordered_ids = [int(pk) for pk in ordered_ids]
+    existing_ids = set(model.objects.filter(**scope).values_list('pk', flat=True))
+    if len(ordered_ids) != len(set(ordered_ids)) or set(ordered_ids) != existing_ids:
+        raise ValueError("The new order must list every item exactly once.")
+    if not ordered_ids:
+        return 0
+
+    if field == 'position':
+        _assign_positions(model, ordered_ids)
+        return len(ordered_ids)
+
+    model.objects.filter(**scope).update(**{field: F(field) + RENUMBER_OFFSET})
+    model.objects.filter(**scope).update(**{field: Case(
+        *[When(pk=pk, then=Value(number)) for number, pk in enumerate(ordered_ids, start=1)],
+        output_field=model._meta.get_field(field),
+    )})
+    return len(ordered_ids)
+
+def is_video_key_in_use(video_key):
+    """
+    Returns True if any course or batch session still references `video_key`.
+    A single primary-key lookup on StoredObject; keys that predate the index
+    (no row yet) fall back to scanning the session tables.
+    """
+    ref_count = StoredObject.objects.filter(pk=video_key).values_list('ref_count', flat=True).first()
+    if ref_count is not None:
+        return ref_count > 0
+    return (
+        CourseClassSession.objects.filter(video_file=video_key).exists()
+        or BatchClassSession.objects.filter(video_file=video_key).exists()
+    )
+
+def _storage_retry_delay(attempts):
+    base = settings.STORAGE_GC_RETRY_BASE_SECONDS
+    return timedelta(seconds=min(base * (2 ** (attempts - 1)), settings.STORAGE_GC_RETRY_MAX_SECONDS))
+
+
+def process_storage_deletions(batch_size=None):
+    """
+    Drains one batch from the StorageDeletion queue.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED so several workers
+    can run side by side. Keys that are referenced again (by the index or,
+    checked last, by the session tables) are dropped from the queue, and keys leased by upload deduplication are postponed until the
+    lease ends; the rest go to S3 in one delete_objects call (up to 1000
+    keys). Failed keys are retried with exponential backoff until
+    STORAGE_GC_MAX_ATTEMPTS is reached.
+    Returns a summary dict (claimed, deleted, skipped, leased, failed).
+    """
+    batch_size = min(batch_size or settings.STORAGE_GC_BATCH_SIZE, 1000)
+    now = timezone.now()
+    summary = {'claimed': 0, 'deleted': 0, 'skipped': 0, 'leased': 0, 'failed': 0}
+
+    with transaction.atomic():
+        rows = list(
+            StorageDeletion.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, attempts__lt=settings.STORAGE_GC_MAX_ATTEMPTS)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        summary['claimed'] = len(rows)
+        if not rows:
+            return summary
+
+        keys = [row.key for row in rows]
+        in_use = set(
+            StoredObject.objects.filter(key__in=keys, ref_count__gt=0).values_list('key', flat=True)
+        )
+        untracked = set(keys) - set(StoredObject.objects.filter(key__in=keys).values_list('key', flat=True))
+        in_use.update(key for key in untracked if is_video_key_in_use(key))
+        leases = dict(
+            StoredObject.objects.filter(key__in=keys, leased_until__gt=now)
+            .exclude(key__in=in_use).values_list('key', 'leased_until')
+        )
+        to_delete = [key for key in keys if key not in in_use and key not in leases]
+        # Last check against the session tables themselves: a drifted count
+        # must not delete an object that is still referenced. Repair it instead.
+        referenced = set(StoredObject.objects.count_references(to_delete))
+        if referenced:
+            StoredObject.objects.resync(referenced)
+            in_use.update(referenced)
+            to_delete = [key for key in to_delete if key not in referenced]
+        summary['skipped'] = len(in_use)
+        summary['leased'] = len(leases)
+
+        errors = {}
+        if to_delete:
+            try:
+                response = get_s3_client().delete_objects(
+                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                    Delete={'Objects': [{'Key': key} for key in to_delete], 'Quiet': True}
+                )
+                errors = {
+                    error['Key']: f"{error.get('Code')}: {error.get('Message')}"
+                    for error in response.get('Errors', [])
+                }
+            except Exception as e:
+                errors = {key: str(e) for key in to_delete}
+
+        deleted = [key for key in to_delete if key not in errors]
+        summary['deleted'] = len(deleted)
+        summary['failed'] = len(errors)
+
+        StorageDeletion.objects.filter(key__in=list(in_use) + deleted).delete()
+        StoredObject.objects.filter(key__in=deleted, ref_count=0).delete()
 
-    if not is_used_in_course and not is_used_in_batch:
-        try:
-            s3_client = get_s3_client()
-            s3_client.delete_object(
+        for row in rows:
+            if row.key in leases:
+                row.next_attempt_at = leases[row.key]
+                continue
+            if row.key not in errors:
+                continue
+            row.attempts += 1
+            row.last_error = errors[row.key]
+            row.next_attempt_at = now + _storage_retry_delay(row.attempts)
+            if row.attempts >= settings.STORAGE_GC_MAX_ATTEMPTS:
+                logger.error(f"Giving up deleting {row.key} after {row.attempts} attempts: {row.last_error}")
+        StorageDeletion.objects.bulk_update(
+            [row for row in rows if row.key in errors or row.key in leases],
+            ['attempts', 'last_error', 'next_attempt_at']
+        )
+
+    if summary['deleted'] or summary['failed']:
+        logger.info(
+            f"Storage GC: deleted {summary['deleted']}, skipped {summary['skipped']}, "
+            f"failed {summary['failed']} of {summary['claimed']} queued object(s)"
+        )
+    return summary
+
+
+def iter_multipart_uploads(prefix='class_videos/'):
+    """
+    Yields in-progress multipart uploads under `prefix` one page at a time,
+    so callers never hold the whole listing in memory.
+    """
+    paginator = get_s3_client().get_paginator('list_multipart_uploads')
+    for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix):
+        for upload in page.get('Uploads', []):
+            yield upload
+
+
+def _abort_stale_upload(upload, dry_run=False):
+    """
+    Sums the stored part sizes of one upload and aborts it.
+    Returns (key, upload_id, reclaimed_bytes, error).
+    """
+    s3_client = get_s3_client()
+    key = upload['Key']
+    upload_id = upload['UploadId']
+    try:
+        reclaimed = 0
+        paginator = s3_client.get_paginator('list_parts')
+        for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key, UploadId=upload_id):
+            reclaimed += sum(part['Size'] for part in page.get('Parts', []))
+        if not dry_run:
+            s3_client.abort_multipart_upload(
                 Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                Key=video_key
+                Key=key,
+                UploadId=upload_id
             )
-            logger.info(f"Successfully deleted unused video from storage: {video_key}")
-        except Exception as e:
-            logger.error(f"Failed to delete video {video_key} from storage: {str(e)}")
+        return key, upload_id, reclaimed, None
+    except Exception as e:
+        return key, upload_id, 0, str(e)
+
+
+def reap_stale_multipart_uploads(max_age_hours=None, batch_size=None, workers=None,
+                                 prefix='class_videos/', dry_run=False):
+    """
+    Aborts multipart uploads under `prefix` that were started more than
+    `max_age_hours` ago and never completed or aborted. Uploads whose
+    UploadSession saw activity (resume, new part URLs) within the same window
+    are still being worked on and are left alone.
+
+    The bucket listing is streamed page by page and stale uploads are aborted
+    in parallel batches of `batch_size`. Matching UploadSession rows are marked
+    aborted. Returns a summary dict (scanned, active, aborted, failed,
+    reclaimed_bytes).
+    """
+    if max_age_hours is None:
+        max_age_hours = settings.STALE_UPLOAD_MAX_AGE_HOURS
+    batch_size = batch_size or settings.STALE_UPLOAD_REAP_BATCH_SIZE
+    workers = workers or settings.STALE_UPLOAD_REAP_WORKERS
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    summary = {'scanned': 0, 'active': 0, 'aborted': 0, 'failed': 0, 'reclaimed_bytes': 0}
+
+    def process(batch, executor):
+        active_ids = set(
+            UploadSession.objects.filter(
+                upload_id__in=[upload['UploadId'] for upload in batch],
+                status=UploadSession.Status.IN_PROGRESS,
+                updated_at__gte=cutoff,
+            ).values_list('upload_id', flat=True)
+        )
+        summary['active'] += len(active_ids)
+        batch = [upload for upload in batch if upload['UploadId'] not in active_ids]
+        aborted_ids = []
+        for key, upload_id, reclaimed, error in executor.map(lambda u: _abort_stale_upload(u, dry_run), batch):
+            if error:
+                summary['failed'] += 1
+                logger.error(f"Failed to abort stale upload {upload_id} ({key}): {error}")
+                continue
+            summary['aborted'] += 1
+            summary['reclaimed_bytes'] += reclaimed
+            aborted_ids.append(upload_id)
+        if aborted_ids and not dry_run:
+            UploadSession.objects.filter(
+                upload_id__in=aborted_ids,
+                status=UploadSession.Status.IN_PROGRESS
+            ).update(status=UploadSession.Status.ABORTED, updated_at=timezone.now())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for upload in iter_multipart_uploads(prefix):
+            summary['scanned'] += 1
+            if upload['Initiated'] >= cutoff:
+                continue
+            batch.append(upload)
+            if len(batch) >= batch_size:
+                process(batch, executor)
+                batch = []
+        if batch:
+            process(batch, executor)
+
+    logger.info(
+        f"Stale upload reaper: scanned {summary['scanned']}, still active {summary['active']}, "
+        f"aborted {summary['aborted']}, "
+        f"failed {summary['failed']}, reclaimed {summary['reclaimed_bytes']} bytes"
+    )
+    return summary
+
+
+def rebuild_stored_object_counts():
+    """
+    Recomputes StoredObject.ref_count from the session tables.
+    Used to seed the index for existing data and to repair drift.
+    Returns the number of keys indexed.
+    """
+    counts = StoredObject.objects.count_references()
+
+    with transaction.atomic():
+        StoredObject.objects.update(ref_count=0)
+        StoredObject.objects.bulk_create(
+            [StoredObject(key=key, ref_count=0) for key in counts],
+            ignore_conflicts=True, batch_size=1000
+        )
+        StoredObject.objects._apply(counts, 1)
+    return len(counts)
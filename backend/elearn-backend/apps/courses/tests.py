@@ -0,0 +1,272 @@
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.courses.models import (
+    Batch, BatchEnrollment, BatchWeek, BatchClassSession, BatchWeeklyTest, BatchTestQuestion, BatchTestQuestionAttachment,
+    Course, CourseWeek, CourseClassSession, CourseWeeklyTest, CourseTestQuestion,
+    CourseTestQuestionAttachment, PostSessionQuestion, PostSessionChoice, StudentSessionView, TestSubmission,
+)
+from apps.courses.serializers.batch_serializers import BatchEnrollmentSerializer
+from apps.courses.serializers.course_module_serializers import BatchWeekSerializer, CourseWeekSerializer
+from apps.courses.services import batch_content_etag, load_batch_content_tree, load_course_content_tree
+from apps.users.models import User, UserType
+from utils.codes import user_codes
+from utils.constants import UserTypeConstants
+
+
+class ContentFixtures:
+    """Builds the course and batch content trees the tests below run against."""
+
+    def build_course(self, weeks, sessions=(('monday', 'i'),), test_questions=0):
+        """`weeks` course weeks, each with `sessions` (weekday, order key), an MCQ per session and a weekly test."""
+        course = Course.objects.create(title=f'{weeks}-week course')
+        for week_number in range(1, weeks + 1):
+            week = CourseWeek.objects.create(course=course, week_number=week_number, title=f'Week {week_number}')
+            for weekday, position in sessions:
+                session = CourseClassSession.objects.create(
+                    course_week=week, weekday=weekday, position=position, title='Session'
+                )
+                mcq = PostSessionQuestion.objects.create(course_session=session, text='Q', order=1)
+                PostSessionChoice.objects.create(question=mcq, text='A', is_correct=True)
+                PostSessionChoice.objects.create(question=mcq, text='B')
+            test = CourseWeeklyTest.objects.create(course_week=week, title='Test')
+            for order in range(1, test_questions + 1):
+                question = CourseTestQuestion.objects.create(test=test, text='Q', order=order)
+                CourseTestQuestionAttachment.objects.create(question=question, file='a.pdf', name='a.pdf')
+        return course
+
+    def build_batch(self, course, linked_weeks=None, own_sessions=(), test_questions=0):
+        """
+        A batch mirroring `course`: weeks in `linked_weeks` (default: all)
+        inherit the course weeks and sessions, the others are plain copies.
+        Each week also gets `own_sessions` and a weekly test.
+        """
+        batch = Batch.objects.create(name=f'{course.title} batch', course=course, start_date=date(2030, 1, 7))
+        for course_week in CourseWeek.objects.filter(course=course).order_by('week_number'):
+            linked = linked_weeks is None or course_week.week_number in linked_weeks
+            week = BatchWeek.objects.create(
+                batch=batch, week_number=course_week.week_number, title=course_week.title,
+                source_week=course_week if linked else None, inherits_content=linked,
+            )
+            for session in course_week.class_sessions.order_by('position', 'id'):
+                BatchClassSession.objects.create(
+                    batch_week=week, weekday=session.weekday, position=session.position, title=session.title,
+                    source_session=session if linked else None, inherits_content=linked,
+                )
+            for weekday, position in own_sessions:
+                BatchClassSession.objects.create(batch_week=week, weekday=weekday, position=position, title='Own session')
+            test = BatchWeeklyTest.objects.create(batch_week=week, title='Test')
+            for order in range(1, test_questions + 1):
+                question = BatchTestQuestion.objects.create(test=test, text='Q', order=order)
+                BatchTestQuestionAttachment.objects.create(question=question, file='a.pdf', name='a.pdf')
+        return batch
+
+    def assertQueryBudget(self, serialize, *roots):
+        """Serializes each root within QUERY_BUDGET queries, whatever its size; returns the last result."""
+        for root in roots:
+            with self.assertNumQueries(self.QUERY_BUDGET):
+                data = serialize(root)
+        return data
+
+
+class CourseContentTreeQueryTests(ContentFixtures, TestCase):
+    # weeks (+ weekly_test), sessions, MCQs, choices, test questions, attachments
+    QUERY_BUDGET = 6
+    SESSIONS = (('monday', '9'), ('monday', 'i'), ('wednesday', 'i'))
+
+    def serialize(self, course):
+        return CourseWeekSerializer(load_course_content_tree(course.id), many=True, context={'request': None}).data
+
+    def test_query_count_does_not_grow_with_the_tree(self):
+        data = self.assertQueryBudget(
+            self.serialize,
+            self.build_course(weeks=1, sessions=self.SESSIONS, test_questions=2),
+            self.build_course(weeks=8, sessions=self.SESSIONS, test_questions=2),
+        )
+
+        self.assertEqual(len(data), 8)
+        week = data[0]
+        self.assertEqual(len(week['class_sessions']), 3)
+        self.assertEqual(
+            [(s['weekday'], s['session_number']) for s in week['class_sessions']],
+            [('monday', 1), ('monday', 2), ('wednesday', 1)],
+        )
+        self.assertEqual(len(week['class_sessions'][0]['mcq_questions'][0]['choices']), 2)
+        self.assertEqual(len(week['weekly_test']['questions']), 2)
+        self.assertEqual(len(week['weekly_test']['questions'][0]['attachments']), 1)
+
+    def test_published_only_filters_weeks(self):
+        course = self.build_course(weeks=2)
+        CourseWeek.objects.filter(course=course, week_number=2).update(is_published=False)
+        CourseWeek.objects.filter(course=course, week_number=1).update(is_published=True)
+
+        weeks = list(load_course_content_tree(course.id, published_only=True))
+
+        self.assertEqual([week.week_number for week in weeks], [1])
+
+
+class BatchContentTreeTests(ContentFixtures, TestCase):
+    # weeks (+ source week, weekly_test), sessions (+ source session), test questions, attachments
+    QUERY_BUDGET = 4
+
+    def build(self, weeks):
+        return self.build_batch(self.build_course(weeks), own_sessions=[('tuesday', 'i')], test_questions=1)
+
+    def serialize(self, batch):
+        return BatchWeekSerializer(load_batch_content_tree(batch.id), many=True, context={'request': None}).data
+
+    def version(self, batch):
+        return Batch.objects.values_list('content_version', flat=True).get(pk=batch.pk)
+
+    def test_query_count_does_not_grow_with_the_tree(self):
+        data = self.assertQueryBudget(self.serialize, self.build(weeks=1), self.build(weeks=6))
+
+        self.assertEqual(len(data), 6)
+        self.assertEqual([s['title'] for s in data[0]['class_sessions']], ['Session', 'Own session'])
+        self.assertEqual(len(data[0]['weekly_test']['questions'][0]['attachments']), 1)
+
+    def test_writes_bump_the_content_version(self):
+        batch = self.build(weeks=1)
+        other = self.build(weeks=1)
+        week = batch.batch_weeks.get()
+        other_version = self.version(other)
+
+        for write in (
+            lambda: BatchClassSession.objects.filter(batch_week=week).last().save(),
+            lambda: BatchTestQuestion.objects.get(test__batch_week=week).save(),
+            lambda: BatchTestQuestionAttachment.objects.get(question__test__batch_week=week).delete(),
+            # Inherited content follows the course row
+            lambda: CourseClassSession.objects.get(linked_batch_sessions__batch_week=week).save(),
+            # ... and is copied into the batch when the course row goes away
+            lambda: CourseClassSession.objects.get(linked_batch_sessions__batch_week=week).delete(),
+        ):
+            before = self.version(batch)
+            write()
+            self.assertGreater(self.version(batch), before)
+        self.assertEqual(self.version(other), other_version)
+
+    def test_etag_changes_with_content_and_audience(self):
+        batch = self.build(weeks=1)
+
+        etag = batch_content_etag(batch.id)
+        self.assertEqual(batch_content_etag(batch.id), etag)
+        self.assertNotEqual(batch_content_etag(batch.id, published_only=True), etag)
+
+        BatchWeek.objects.get(batch=batch).save()
+        self.assertNotEqual(batch_content_etag(batch.id), etag)
+        self.assertIsNone(batch_content_etag(0))
+
+    def test_week_list_answers_conditional_requests(self):
+        batch = self.build(weeks=1)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            email='teacher@example.com', password='x', fullname='Teacher',
+            user_type=UserType.objects.get_or_create(name=UserTypeConstants.TEACHER)[0],
+        ))
+        url = reverse('batch-week-list', args=[batch.id])
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):  # the content version; the tree is not loaded
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        BatchClassSession.objects.filter(batch_week__batch=batch).last().save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class EnrollmentProgressTests(ContentFixtures, TestCase):
+    # batch structure, completed session views, test submissions
+    QUERY_BUDGET = 3
+    METRICS = (
+        'overall_progress', 'weeks_completed', 'total_weeks', 'weekly_tests_submitted', 'total_weekly_tests',
+        'quizzes_done', 'total_quizzes', 'marks_obtained', 'total_marks',
+    )
+
+    def setUp(self):
+        # Only week 1 still links to the course sessions that carry the MCQs
+        course = self.build_course(weeks=2, sessions=(('monday', '9'), ('monday', 'i')))
+        self.batch = self.build_batch(course, linked_weeks={1})
+        self.weeks = [
+            (week, list(week.class_sessions.order_by('position')), week.weekly_test)
+            for week in self.batch.batch_weeks.order_by('week_number')
+        ]
+        # Week 1's test is out of 100, week 2's out of 50
+        for (_, _, test), marks in zip(self.weeks, ((60, 40), (50,))):
+            BatchTestQuestion.objects.bulk_create([
+                BatchTestQuestion(test=test, text='Q', order=order, marks=question_marks)
+                for order, question_marks in enumerate(marks, 1)
+            ])
+
+    def enroll(self, count):
+        students = User.objects.bulk_create([
+            User(email=f'student{n}@example.com', fullname=f'Student {n}', user_code=code)
+            for n, code in enumerate(user_codes.allocate(count))
+        ])
+        return BatchEnrollment.objects.bulk_create(
+            [BatchEnrollment(batch=self.batch, student=student) for student in students]
+        )
+
+    def serialize(self):
+        enrollments = self.batch.enrollments.all().select_related('student').order_by('id')
+        return BatchEnrollmentSerializer(enrollments, many=True).data
+
+    def test_metrics(self):
+        enrollment, idle = self.enroll(2)
+        (week1, sessions1, test1), (week2, sessions2, test2) = self.weeks
+        for session in sessions1 + sessions2[:1]:
+            StudentSessionView.objects.create(enrollment=enrollment, batch_session=session, is_completed=True)
+        StudentSessionView.objects.create(enrollment=enrollment, batch_session=sessions2[1], watched_percent=40)
+        TestSubmission.objects.create(batch_weekly_test=test1, enrollment=enrollment, attempt_number=1,
+                                      marks_obtained=60, status=TestSubmission.Status.PUBLISHED)
+        TestSubmission.objects.create(batch_weekly_test=test1, enrollment=enrollment, attempt_number=2,
+                                      marks_obtained=80, status=TestSubmission.Status.PUBLISHED)
+        TestSubmission.objects.create(batch_weekly_test=test2, enrollment=enrollment)
+
+        data = {row['id']: row for row in self.serialize()}
+
+        self.assertEqual(
+            {key: data[enrollment.id][key] for key in self.METRICS},
+            {
+                'overall_progress': 83.3, 'weeks_completed': 1, 'total_weeks': 2,
+                'weekly_tests_submitted': 2, 'total_weekly_tests': 2,
+                'quizzes_done': 0, 'total_quizzes': 2,
+                'marks_obtained': 80.0, 'total_marks': 100.0,
+            },
+        )
+        self.assertEqual(data[idle.id]['overall_progress'], 0.0)
+        self.assertEqual(data[idle.id]['weeks_completed'], 0)
+        self.assertEqual(data[idle.id]['total_marks'], 0)
+
+    def test_total_marks_sum_the_question_marks(self):
+        enrollment, = self.enroll(1)
+        (_, _, test1), (_, _, test2) = self.weeks
+        TestSubmission.objects.create(batch_weekly_test=test1, enrollment=enrollment,
+                                      marks_obtained=80, status=TestSubmission.Status.PUBLISHED)
+        TestSubmission.objects.create(batch_weekly_test=test2, enrollment=enrollment,
+                                      marks_obtained=35, status=TestSubmission.Status.PUBLISHED)
+
+        row, = self.serialize()
+
+        self.assertEqual((row['marks_obtained'], row['total_marks']), (115.0, 150.0))
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        for enrollment in self.enroll(200):
+            StudentSessionView.objects.create(
+                enrollment=enrollment, batch_session=self.weeks[0][1][0], is_completed=True
+            )
+
+        # One more for the enrollments themselves
+        with self.assertNumQueries(self.QUERY_BUDGET + 1):
+            data = self.serialize()
+
+        self.assertEqual(len(data), 200)
+        self.assertEqual(data[0]['overall_progress'], 16.7)
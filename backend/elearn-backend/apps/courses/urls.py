@@ -5,6 +5,7 @@ from apps.courses.views import (
     CourseDetailView,
     CourseUpdateView,
     CourseToggleActiveView,
+    CourseContentSyncView,
     BatchSummaryView,
     BatchListView,
     BatchCreateView,
@@ -16,8 +17,10 @@ from apps.courses.views import (
     BatchStudentListView,
     CourseWeekListCreateView,
     CourseWeekDetailView,
+    CourseWeekReorderView,
     ClassSessionListCreateView,
     ClassSessionDetailView,
+    ClassSessionReorderView,
     WeeklyTestView,
     WeeklyTestQuestionListCreateView,
     WeeklyTestQuestionDetailView,
@@ -32,8 +35,13 @@ from apps.courses.views import (
     BatchWeeklyTestQuestionListCreateView,
     BatchWeeklyTestQuestionDetailView,
     CloneBatchContentView,
+    CloneJobStatusView,
+    CloneJobRetryView,
     ExtendBatchTimelineView,
+    ExtendAllBatchesTimelineView,
     InitMultipartUploadView,
+    UploadPartUrlsView,
+    ResumeMultipartUploadView,
     CompleteMultipartUploadView,
     AbortMultipartUploadView,
 )
@@ -47,6 +55,8 @@ from apps.courses.views.test_submission_views import (
 urlpatterns = [
     # Video Uploads
     path("courses/upload/init/", InitMultipartUploadView.as_view(), name="upload-init"),
+    path("courses/upload/parts/", UploadPartUrlsView.as_view(), name="upload-part-urls"),
+    path("courses/upload/resume/", ResumeMultipartUploadView.as_view(), name="upload-resume"),
     path("courses/upload/complete/", CompleteMultipartUploadView.as_view(), name="upload-complete"),
     path("courses/upload/abort/", AbortMultipartUploadView.as_view(), name="upload-abort"),
 
@@ -56,11 +66,14 @@ urlpatterns = [
     path("courses/<int:pk>/", CourseDetailView.as_view(), name="course-detail"),
     path("courses/<int:pk>/update/", CourseUpdateView.as_view(), name="course-update"),
     path("courses/<int:pk>/toggle-active/", CourseToggleActiveView.as_view(), name="course-toggle-active"),
+    path("courses/<int:pk>/sync-content/", CourseContentSyncView.as_view(), name="course-sync-content"),
 
     # Course Modules (Weeks & Sessions)
     path("courses/<int:course_id>/weeks/", CourseWeekListCreateView.as_view(), name="course-week-list-create"),
+    path("courses/<int:course_id>/weeks/reorder/", CourseWeekReorderView.as_view(), name="course-week-reorder"),
     path("courses/<int:course_id>/weeks/<int:week_id>/", CourseWeekDetailView.as_view(), name="course-week-detail"),
     path("courses/<int:course_id>/weeks/<int:week_id>/sessions/", ClassSessionListCreateView.as_view(), name="class-session-list-create"),
+    path("courses/<int:course_id>/weeks/<int:week_id>/sessions/reorder/", ClassSessionReorderView.as_view(), name="class-session-reorder"),
     path("courses/<int:course_id>/weeks/<int:week_id>/sessions/<int:session_id>/", ClassSessionDetailView.as_view(), name="class-session-detail"),
     path("courses/<int:course_id>/weeks/<int:week_id>/test/", WeeklyTestView.as_view(), name="weekly-test"),
     path("courses/<int:course_id>/weeks/<int:week_id>/test/questions/", WeeklyTestQuestionListCreateView.as_view(), name="weekly-test-question-list-create"),
@@ -77,8 +90,11 @@ urlpatterns = [
     path("batches/<int:pk>/status/", BatchUpdateStatusView.as_view(), name="batch-update-status"),
     path("batches/<int:pk>/add-student/", BatchAddStudentView.as_view(), name="batch-add-student"),
     path("batches/available-students/", AvailableStudentListView.as_view(), name="batch-available-students"),
+    path("batches/extend-timeline/", ExtendAllBatchesTimelineView.as_view(), name="batches-extend-timeline"),
     path("batches/<int:pk>/students/", BatchStudentListView.as_view(), name="batch-student-list"),
     path("batches/<int:pk>/clone-content/", CloneBatchContentView.as_view(), name="batch-clone-content"),
+    path("batches/<int:pk>/clone-jobs/<int:job_id>/", CloneJobStatusView.as_view(), name="batch-clone-job-status"),
+    path("batches/<int:pk>/clone-jobs/<int:job_id>/retry/", CloneJobRetryView.as_view(), name="batch-clone-job-retry"),
     path("batches/<int:pk>/extend-timeline/", ExtendBatchTimelineView.as_view(), name="batch-extend-timeline"),
     path("batches/<int:batch_id>/weeks/", BatchWeekListView.as_view(), name="batch-week-list"),
     path("batches/<int:batch_id>/weeks/<int:week_id>/", BatchWeekDetailView.as_view(), name="batch-week-detail"),
@@ -4,6 +4,7 @@ from .course_views import (
     CourseDetailView,
     CourseUpdateView,
     CourseToggleActiveView,
+    CourseContentSyncView,
 )
 from .batch_views import (
     BatchSummaryView,
@@ -16,14 +17,19 @@ from .batch_views import (
     AvailableStudentListView,
     BatchStudentListView,
     CloneBatchContentView,
+    CloneJobStatusView,
+    CloneJobRetryView,
     ExtendBatchTimelineView,
+    ExtendAllBatchesTimelineView,
 )
 
 from .course_module_views import (
     CourseWeekListCreateView,
     CourseWeekDetailView,
+    CourseWeekReorderView,
     ClassSessionListCreateView,
     ClassSessionDetailView,
+    ClassSessionReorderView,
     WeeklyTestView,
     WeeklyTestQuestionListCreateView,
     WeeklyTestQuestionDetailView,
@@ -44,6 +50,8 @@ from .batch_content_views import (
 
 from .upload_views import (
     InitMultipartUploadView,
+    UploadPartUrlsView,
+    ResumeMultipartUploadView,
     CompleteMultipartUploadView,
     AbortMultipartUploadView,
 )
@@ -54,6 +62,7 @@ __all__ = [
     'CourseDetailView',
     'CourseUpdateView',
     'CourseToggleActiveView',
+    'CourseContentSyncView',
     'BatchSummaryView',
     'BatchListView',
     'BatchCreateView',
@@ -64,11 +73,16 @@ __all__ = [
     'AvailableStudentListView',
     'BatchStudentListView',
     'CloneBatchContentView',
+    'CloneJobStatusView',
+    'CloneJobRetryView',
     'ExtendBatchTimelineView',
+    'ExtendAllBatchesTimelineView',
     'CourseWeekListCreateView',
     'CourseWeekDetailView',
+    'CourseWeekReorderView',
     'ClassSessionListCreateView',
     'ClassSessionDetailView',
+    'ClassSessionReorderView',
     'WeeklyTestView',
     'WeeklyTestQuestionListCreateView',
     'WeeklyTestQuestionDetailView',
@@ -79,6 +93,8 @@ __all__ = [
     'BatchClassSessionListCreateView',
     'BatchWeeklyTestView',
     'InitMultipartUploadView',
+    'UploadPartUrlsView',
+    'ResumeMultipartUploadView',
     'CompleteMultipartUploadView',
     'AbortMultipartUploadView',
 ]
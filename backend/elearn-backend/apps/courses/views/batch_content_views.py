@@ -1,8 +1,11 @@
 import logging
 from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from drf_spectacular.utils import extend_schema
+from django.db import transaction
+from django.utils.http import parse_etags
 
 from apps.courses.models import Batch, BatchWeek, BatchClassSession, BatchWeeklyTest, BatchTestQuestion
 from apps.courses.serializers.course_module_serializers import (
@@ -14,10 +17,12 @@ from apps.courses.serializers.course_module_serializers import (
     BatchWeeklyTestCreateUpdateSerializer,
     BatchTestQuestionSerializer,
 )
+from apps.courses.services import (
+    batch_content_etag, delete_and_renumber, load_batch_content_tree, lock_ordering_parent, place_session,
+)
 from utils.permissions import IsAdminOrTeacher, IsAuthenticated
 from utils.common import format_success_response, handle_serializer_errors, ServiceError
 from utils.constants import UserTypeConstants
-from apps.courses.services import delete_unused_video_from_storage
 
 logger = logging.getLogger(__name__)
 
@@ -27,15 +32,23 @@ class BatchWeekListView(APIView):
 
     @extend_schema(summary="List weeks for a specific batch")
     def get(self, request, batch_id):
-        weeks = BatchWeek.objects.filter(batch_id=batch_id).order_by('week_number')
-        
         user = request.user
-        if getattr(user, 'user_type', None) and user.user_type.name == UserTypeConstants.STUDENT:
-            # For students, only show published weeks
-            weeks = weeks.filter(is_published=True)
-
-        serializer = BatchWeekSerializer(weeks, many=True, context={'request': request})
-        return format_success_response(message="Batch weeks retrieved successfully", data=serializer.data)
+        # For students, only show published weeks
+        published_only = bool(
+            getattr(user, 'user_type', None) and user.user_type.name == UserTypeConstants.STUDENT
+        )
+
+        etag = batch_content_etag(batch_id, published_only)
+        if etag and etag in (tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            weeks = load_batch_content_tree(batch_id, published_only)
+            serializer = BatchWeekSerializer(weeks, many=True, context={'request': request})
+            response = format_success_response(message="Batch weeks retrieved successfully", data=serializer.data)
+        if etag:
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
 
 @extend_schema(tags=["Batch Content"])
 class BatchWeekDetailView(APIView):
@@ -54,7 +67,10 @@ class BatchWeekDetailView(APIView):
         if not serializer.is_valid():
             error_str = handle_serializer_errors(serializer)
             raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
-        
+
+        # Editing inherited content gives the week its own copy first
+        if set(serializer.validated_data).intersection(BatchWeek.INHERITED_FIELDS):
+            week.materialize()
         serializer.save()
         return format_success_response(message="Batch week updated successfully")
 
@@ -64,22 +80,7 @@ class BatchWeekDetailView(APIView):
         if not week.can_modify_content():
             raise ServiceError(detail="Cannot delete a week that has already been unlocked.", status_code=status.HTTP_400_BAD_REQUEST)
         
-        batch = week.batch
-        deleted_week_number = week.week_number
-
-        week.delete()
-
-        # Re-order subsequent batch weeks
-        subsequent_weeks = BatchWeek.objects.filter(
-            batch=batch,
-            week_number__gt=deleted_week_number
-        ).order_by('week_number')
-
-        for subsequent_week in subsequent_weeks:
-            # Direct update
-            BatchWeek.objects.filter(id=subsequent_week.id).update(
-                week_number=subsequent_week.week_number - 1
-            )
+        delete_and_renumber(week)
 
         return format_success_response(message="Batch week deleted and order adjusted successfully")
 
@@ -97,7 +98,7 @@ class BatchClassSessionListCreateView(APIView):
     @extend_schema(summary="List sessions for a batch week")
     def get(self, request, batch_id, week_id):
         week = self.get_week(batch_id, week_id)
-        sessions = BatchClassSession.objects.filter(batch_week=week)
+        sessions = BatchClassSession.objects.filter(batch_week=week).select_related('source_session')
         serializer = BatchClassSessionSerializer(sessions, many=True, context={'request': request})
         return format_success_response(message="Batch sessions retrieved successfully", data=serializer.data)
 
@@ -109,34 +110,21 @@ class BatchClassSessionListCreateView(APIView):
             error_str = handle_serializer_errors(serializer)
             raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
 
-        session_number = serializer.validated_data.get('session_number')
-        weekday = serializer.validated_data.get('weekday')
-        if session_number and weekday:
-            existing_numbers = set(
-                BatchClassSession.objects.filter(batch_week=week, weekday=weekday).values_list('session_number', flat=True)
-            )
-            if session_number in existing_numbers:
-                raise ServiceError(
-                    detail=f"Session {session_number} already exists for {weekday.capitalize()}.",
-                    status_code=status.HTTP_400_BAD_REQUEST
-                )
-            missing = [i for i in range(1, session_number) if i not in existing_numbers]
-            if missing:
-                missing_str = ', '.join(str(m) for m in missing)
-                raise ServiceError(
-                    detail=f"Session {missing_str} for {weekday.capitalize()} must be created first before adding Session {session_number}.",
-                    status_code=status.HTTP_400_BAD_REQUEST
-                )
-
+        session_number = serializer.validated_data.pop('session_number', None)
         try:
-            BatchClassSession.objects.create(
-                batch_week=week,
-                uploaded_by=request.user,
-                **serializer.validated_data
-            )
+            with transaction.atomic():
+                session = BatchClassSession(
+                    batch_week=week,
+                    uploaded_by=request.user,
+                    **serializer.validated_data
+                )
+                lock_ordering_parent(session)
+                # Inserting between two sessions only writes the new row
+                place_session(session, session_number)
+                session.save()
             return format_success_response(message="Batch session created successfully", status_code=status.HTTP_201_CREATED)
-        except IntegrityError:
-            raise ServiceError(detail="A session with this number already exists for this week.", status_code=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
         except ServiceError:
             raise
         except Exception as e:
@@ -166,7 +154,7 @@ class BatchClassSessionDetailView(APIView):
 
     def get_object(self, batch_id, week_id, session_id):
         try:
-            return BatchClassSession.objects.get(id=session_id, batch_week_id=week_id, batch_week__batch_id=batch_id)
+            return BatchClassSession.objects.with_session_numbers().get(id=session_id, batch_week_id=week_id, batch_week__batch_id=batch_id)
         except BatchClassSession.DoesNotExist:
             raise ServiceError(detail="Batch session not found.", status_code=status.HTTP_404_NOT_FOUND)
 
@@ -177,8 +165,21 @@ class BatchClassSessionDetailView(APIView):
         if not serializer.is_valid():
             error_str = handle_serializer_errors(serializer)
             raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
-        
-        serializer.save()
+
+        new_session_number = serializer.validated_data.pop('session_number', None)
+        new_weekday = serializer.validated_data.get('weekday')
+        with transaction.atomic():
+            if (new_session_number and new_session_number != session.visible_number) or (new_weekday and new_weekday != session.weekday):
+                lock_ordering_parent(session)
+                try:
+                    place_session(session, new_session_number, new_weekday)
+                except ValueError as e:
+                    raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+
+            # Editing inherited content gives the session its own copy first
+            if set(serializer.validated_data).intersection(BatchClassSession.INHERITED_FIELDS):
+                session.materialize()
+            serializer.save()
         return format_success_response(message="Batch session updated successfully")
 
     @extend_schema(summary="Delete a batch session")
@@ -187,29 +188,11 @@ class BatchClassSessionDetailView(APIView):
         if not session.batch_week.can_modify_content():
             raise ServiceError(detail="Cannot delete content from an unlocked week.", status_code=status.HTTP_400_BAD_REQUEST)
         
-        batch_week = session.batch_week
-        deleted_session_number = session.session_number
-        video_file_key = session.video_file
-
+        # Later sessions keep their order keys, so nothing is renumbered;
+        # the post_delete signal queues the video key for the storage GC worker.
         session.delete()
 
-        # Re-order subsequent sessions to fill the gap left by the deleted session.
-        subsequent_sessions = BatchClassSession.objects.filter(
-            batch_week=batch_week,
-            weekday=session.weekday,
-            session_number__gt=deleted_session_number
-        ).order_by('session_number')
-
-        for subsequent_session in subsequent_sessions:
-            # Direct update to bypass constraints/signals
-            BatchClassSession.objects.filter(id=subsequent_session.id).update(
-                session_number=subsequent_session.session_number - 1
-            )
-
-        if video_file_key:
-            delete_unused_video_from_storage(video_file_key)
-
-        return format_success_response(message="Batch session deleted and order adjusted successfully")
+        return format_success_response(message="Batch session deleted successfully")
 
 @extend_schema(tags=["Batch Content"])
 class BatchWeeklyTestManageView(APIView):
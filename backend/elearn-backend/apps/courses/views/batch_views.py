@@ -7,17 +7,18 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from django.db.models import Q
 
-from apps.courses.models import Batch, BatchEnrollment
+from apps.courses.models import Batch, BatchEnrollment, CloneJob
 from apps.courses.serializers import (
     BatchListSerializer,
     BatchCreateUpdateSerializer,
     BatchEnrollmentSerializer,
+    CloneJobSerializer,
 )
 from apps.users.serializers.user_management_serializers import UserManagementSerializer
 from apps.users.models import User
 from apps.courses.models import BatchWeek
 
-from utils.permissions import IsAuthenticated, IsSuperAdminAdminOrTeacher
+from utils.permissions import IsAuthenticated, IsSuperAdminOrAdmin, IsSuperAdminAdminOrTeacher
 from utils.common import (
     format_success_response, handle_serializer_errors, ServiceError, 
     activate_user_and_send_welcome_email, get_current_local_date,
@@ -25,7 +26,7 @@ from utils.common import (
 )
 from utils.pagination import CustomPageNumberPagination
 from utils.constants import UserTypeConstants
-from apps.courses.services import initialize_batch_weeks, push_content_to_batch, extend_batch_timeline
+from apps.courses.services import initialize_batch_weeks, create_clone_job, requeue_clone_job, extend_batch_timeline, extend_batches_timeline
 
 logger = logging.getLogger(__name__)
 
@@ -84,7 +85,7 @@ class BatchListView(APIView):
         responses={200: BatchListSerializer(many=True)},
     )
     def get(self, request):
-        qs = Batch.objects.select_related('teacher', 'course').order_by('-created_at')
+        qs = Batch.objects.select_related('teacher', 'course').with_list_stats().order_by('-created_at')
 
         user = request.user
         if getattr(user, 'user_type', None):
@@ -535,6 +536,23 @@ class BatchStudentListView(APIView):
             raise ServiceError(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def parse_extension_days(request):
+    try:
+        days = int(request.query_params.get('days', 0))
+    except ValueError:
+        days = 0
+    if days <= 0:
+        raise ServiceError(detail="Days must be greater than 0", status_code=status.HTTP_400_BAD_REQUEST)
+    return days
+
+def serialize_timeline_extension(extension):
+    return {
+        'batch': extension.batch_id,
+        'days': extension.days,
+        'weeks_affected': extension.weeks_affected,
+        'week_numbers': extension.week_numbers,
+    }
+
 @extend_schema(tags=["Batches"])
 class ExtendBatchTimelineView(APIView):
     permission_classes = [IsSuperAdminAdminOrTeacher]
@@ -543,51 +561,148 @@ class ExtendBatchTimelineView(APIView):
         summary="Extend batch timeline by adding days to future unlock dates",
         parameters=[
             OpenApiParameter("days", OpenApiTypes.INT, description="Number of days to extend"),
+            OpenApiParameter("reason", OpenApiTypes.STR, description="Optional reason stored in the audit log"),
         ],
         responses={200: None},
     )
     def post(self, request, pk):
         try:
-            days = int(request.query_params.get('days', 0))
-            if days <= 0:
-                raise ServiceError(detail="Days must be greater than 0", status_code=status.HTTP_400_BAD_REQUEST)
-            
-            extend_batch_timeline(pk, days)
-            return format_success_response(message=f"Batch timeline extended by {days} days")
+            days = parse_extension_days(request)
+            batch = Batch.objects.get(pk=pk)
+            extension = extend_batch_timeline(
+                batch.id, days,
+                extended_by=request.user,
+                reason=request.query_params.get('reason', '')[:255]
+            )
+            return format_success_response(
+                message=f"Batch timeline extended by {days} days",
+                data=serialize_timeline_extension(extension)
+            )
+        except Batch.DoesNotExist:
+            raise ServiceError(detail="Batch not found", status_code=status.HTTP_404_NOT_FOUND)
+        except ServiceError:
+            raise
         except Exception as e:
             logger.error(f"Error extending timeline: {str(e)}")
             raise ServiceError(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@extend_schema(tags=["Batches"])
+class ExtendAllBatchesTimelineView(APIView):
+    permission_classes = [IsSuperAdminOrAdmin]
+
+    @extend_schema(
+        summary="Extend the timeline of several batches at once (e.g. for a holiday)",
+        description="Admin only. Shifts every future unlock date of the given batches (default: all active batches) "
+                    "in a single update and records one audit row per batch.",
+        parameters=[
+            OpenApiParameter("days", OpenApiTypes.INT, description="Number of days to extend"),
+            OpenApiParameter("batch_ids", OpenApiTypes.STR, description="Optional comma-separated batch IDs"),
+            OpenApiParameter("reason", OpenApiTypes.STR, description="Optional reason stored in the audit log"),
+        ],
+        responses={200: None},
+    )
+    def post(self, request):
+        try:
+            days = parse_extension_days(request)
+            batches = Batch.objects.filter(status=Batch.Status.ACTIVE)
+            batch_ids = request.query_params.get('batch_ids')
+            if batch_ids:
+                try:
+                    batches = Batch.objects.filter(id__in=[int(b) for b in batch_ids.split(',') if b.strip()])
+                except ValueError:
+                    raise ServiceError(detail="batch_ids must be a comma-separated list of IDs.", status_code=status.HTTP_400_BAD_REQUEST)
+
+            extensions = extend_batches_timeline(
+                list(batches.values_list('id', flat=True)), days,
+                extended_by=request.user,
+                reason=request.query_params.get('reason', '')[:255]
+            )
+            return format_success_response(
+                message=f"Timeline extended by {days} days for {len(extensions)} batch(es)",
+                data=[serialize_timeline_extension(extension) for extension in extensions]
+            )
+        except ServiceError:
+            raise
+        except Exception as e:
+            logger.error(f"Error extending timelines: {str(e)}")
+            raise ServiceError(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @extend_schema(tags=["Batches"])
 class CloneBatchContentView(APIView):
     permission_classes = [IsSuperAdminAdminOrTeacher]
 
     @extend_schema(
         summary="Push/Clone content from a Course or another Batch to this Batch",
+        description="Queues a background clone job and returns it immediately (202). "
+                    "Poll the clone job status endpoint for progress.",
         request=None,
         parameters=[
             OpenApiParameter("source_course_id", OpenApiTypes.INT, description="Source Course ID"),
             OpenApiParameter("source_batch_id", OpenApiTypes.INT, description="Source Batch ID"),
         ],
-        responses={200: None},
+        responses={202: CloneJobSerializer},
     )
     def post(self, request, pk):
         try:
             source_course_id = request.query_params.get('source_course_id')
             source_batch_id = request.query_params.get('source_batch_id')
-            
-            success = push_content_to_batch(
-                source_batch_id=source_batch_id,
+
+            job = create_clone_job(
+                target_batch_id=pk,
                 source_course_id=source_course_id,
-                target_batch_id=pk
+                source_batch_id=source_batch_id,
+                requested_by=request.user,
             )
-            
-            if success:
-                return format_success_response(message="Content pushed successfully")
-            else:
-                raise ServiceError(detail="Missing source source_course_id or source_batch_id", status_code=status.HTTP_400_BAD_REQUEST)
+            return format_success_response(
+                message="Content push queued",
+                data=CloneJobSerializer(job).data,
+                status_code=status.HTTP_202_ACCEPTED
+            )
+        except Batch.DoesNotExist:
+            raise ServiceError(detail="Batch not found", status_code=status.HTTP_404_NOT_FOUND)
         except ValueError as e:
             raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error cloning content: {str(e)}")
+            logger.error(f"Error queueing content clone: {str(e)}")
             raise ServiceError(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(tags=["Batches"])
+class CloneJobStatusView(APIView):
+    permission_classes = [IsSuperAdminAdminOrTeacher]
+
+    @extend_schema(
+        summary="Get the status and progress of a content clone job",
+        responses={200: CloneJobSerializer},
+    )
+    def get(self, request, pk, job_id):
+        job = CloneJob.objects.filter(pk=job_id, target_batch_id=pk).first()
+        if job is None:
+            raise ServiceError(detail="Clone job not found", status_code=status.HTTP_404_NOT_FOUND)
+        return format_success_response(
+            message="Clone job retrieved",
+            data=CloneJobSerializer(job).data
+        )
+
+@extend_schema(tags=["Batches"])
+class CloneJobRetryView(APIView):
+    permission_classes = [IsSuperAdminAdminOrTeacher]
+
+    @extend_schema(
+        summary="Re-queue a failed content clone job",
+        description="Puts a failed clone job back on the queue; the rerun continues where it stopped.",
+        request=None,
+        responses={202: CloneJobSerializer},
+    )
+    def post(self, request, pk, job_id):
+        job = CloneJob.objects.filter(pk=job_id, target_batch_id=pk).first()
+        if job is None:
+            raise ServiceError(detail="Clone job not found", status_code=status.HTTP_404_NOT_FOUND)
+        try:
+            job = requeue_clone_job(job)
+        except ValueError as e:
+            raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+        return format_success_response(
+            message="Clone job re-queued",
+            data=CloneJobSerializer(job).data,
+            status_code=status.HTTP_202_ACCEPTED
+        )
@@ -3,7 +3,7 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from drf_spectacular.utils import extend_schema
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 
 from apps.courses.models import Course, CourseWeek, CourseClassSession, CourseWeeklyTest, CourseTestQuestion, CourseTestQuestionAttachment, BatchEnrollment
 from apps.courses.serializers.course_module_serializers import (
@@ -15,11 +15,13 @@ from apps.courses.serializers.course_module_serializers import (
     CourseWeeklyTestCreateUpdateSerializer,
     CourseTestQuestionSerializer,
     CourseTestQuestionAttachmentSerializer,
+    CourseWeekReorderSerializer,
+    ClassSessionReorderSerializer,
 )
+from apps.courses.services import apply_order, delete_and_renumber, load_course_content_tree, lock_ordering_parent, ordering_scope, place_session, swap_numbers
 from utils.permissions import IsSuperAdminAdminOrTeacher, IsAuthenticated
 from utils.common import format_success_response, handle_serializer_errors, ServiceError
 from utils.constants import UserTypeConstants
-from apps.courses.services import delete_unused_video_from_storage
 
 logger = logging.getLogger(__name__)
 
@@ -37,11 +39,9 @@ class CourseWeekListCreateView(APIView):
     @extend_schema(summary="List course weeks for a course", responses={200: CourseWeekSerializer(many=True)})
     def get(self, request, course_id):
         course = self.get_course(course_id)
-        weeks = CourseWeek.objects.filter(course=course)
-        
         user = request.user
-        if getattr(user, 'user_type', None) and user.user_type.name == UserTypeConstants.STUDENT:
-            weeks = weeks.filter(is_published=True)
+        is_student = getattr(user, 'user_type', None) and user.user_type.name == UserTypeConstants.STUDENT
+        weeks = load_course_content_tree(course.id, published_only=bool(is_student))
 
         serializer = CourseWeekSerializer(weeks, many=True, context={'request': request})
         return format_success_response(message="Course weeks retrieved successfully", data=serializer.data)
@@ -118,45 +118,28 @@ class CourseWeekDetailView(APIView):
             raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Smart reorder by swap when week_number is being changed
-            new_week_number = serializer.validated_data.get('week_number')
-            old_week_number = week.week_number
-            occupying_week = None
-
-            if new_week_number and new_week_number != old_week_number:
-                max_existing = CourseWeek.objects.filter(course=week.course).exclude(id=week.id).count()
-                # The new number must be within 1..max_existing to stay sequential (or max+1 if the week is the last one)
-                if new_week_number > max_existing + 1 or new_week_number < 1:
-                    raise ServiceError(
-                        detail=f"Week number must be between 1 and {max_existing + 1}.",
-                        status_code=status.HTTP_400_BAD_REQUEST
-                    )
-                # Park the occupying week at a safe temp number before the swap.
-                # Use queryset update() to bypass PositiveSmallIntegerField validation.
-                # Temp = current max week_number + 9999, guaranteed to not conflict.
-                try:
-                    occupying_week = CourseWeek.objects.get(
-                        course=week.course,
-                        week_number=new_week_number
-                    )
-                    from django.db.models import Max as _Max
-                    current_max = CourseWeek.objects.filter(course=week.course).aggregate(m=_Max('week_number'))['m'] or 0
-                    safe_temp = current_max + 9999
-                    # Step 1: park occupying_week at safe_temp to free the target slot
-                    CourseWeek.objects.filter(id=occupying_week.id).update(week_number=safe_temp)
-                except CourseWeek.DoesNotExist:
-                    pass  # Target slot is free — no swap needed
-
-            # Step 2: save the main week to its new number (target slot is now free)
-            for attr, value in serializer.validated_data.items():
-                setattr(week, attr, value)
-            week.updated_by = request.user
-            week.save()
+            with transaction.atomic():
+                lock_ordering_parent(week)
+                # Smart reorder by swap when week_number is being changed
+                new_week_number = serializer.validated_data.get('week_number')
+                old_week_number = week.week_number
+
+                if new_week_number and new_week_number != old_week_number:
+                    max_existing = CourseWeek.objects.filter(course=week.course).exclude(id=week.id).count()
+                    # The new number must be within 1..max_existing to stay sequential (or max+1 if the week is the last one)
+                    if new_week_number > max_existing + 1 or new_week_number < 1:
+                        raise ServiceError(
+                            detail=f"Week number must be between 1 and {max_existing + 1}.",
+                            status_code=status.HTTP_400_BAD_REQUEST
+                        )
+                    # The displaced week (if any) takes the old slot
+                    swap_numbers(CourseWeek, ordering_scope(week), old_week_number, new_week_number)
+
+                for attr, value in serializer.validated_data.items():
+                    setattr(week, attr, value)
+                week.updated_by = request.user
+                week.save()
 
-            # Step 3: move the displaced week into the old slot
-            if occupying_week is not None:
-                CourseWeek.objects.filter(id=occupying_week.id).update(week_number=old_week_number)
-            
             return format_success_response(message="Course week updated successfully", data=None)
         except IntegrityError:
             raise ServiceError(detail="A week with this number already exists for this course.", status_code=status.HTTP_400_BAD_REQUEST)
@@ -170,24 +153,8 @@ class CourseWeekDetailView(APIView):
     def delete(self, request, course_id, week_id):
         try:
             week = self.get_object(course_id, week_id)
-            course = week.course
-            deleted_week_number = week.week_number
-
-            # Delete the current week
-            week.delete()
-
-            # Re-order the subsequent weeks to fill the gap left by the deleted week.
-            # E.g., if Week 2 is deleted from [1, 2, 3, 4], Week 3 becomes 2, and 4 becomes 3.
-            subsequent_weeks = CourseWeek.objects.filter(
-                course=course,
-                week_number__gt=deleted_week_number
-            ).order_by('week_number')
-
-            for subsequent_week in subsequent_weeks:
-                # Direct update to avoid unique constraint issues if we did it out of order
-                CourseWeek.objects.filter(id=subsequent_week.id).update(
-                    week_number=subsequent_week.week_number - 1
-                )
+            # Closes the gap, e.g. deleting Week 2 of [1, 2, 3, 4] makes 3 -> 2 and 4 -> 3
+            delete_and_renumber(week)
 
             return format_success_response(message="Course week deleted and order adjusted successfully")
         except ServiceError:
@@ -197,6 +164,30 @@ class CourseWeekDetailView(APIView):
             raise ServiceError(detail="An error occurred while deleting the course week.", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema(tags=["Course Weeks"])
+class CourseWeekReorderView(APIView):
+    permission_classes = [IsSuperAdminAdminOrTeacher]
+
+    @extend_schema(
+        summary="Reorder all weeks of a course",
+        request=CourseWeekReorderSerializer,
+        responses={200: None}
+    )
+    def put(self, request, course_id):
+        if not Course.objects.filter(pk=course_id).exists():
+            raise ServiceError(detail="Course not found.", status_code=status.HTTP_404_NOT_FOUND)
+        serializer = CourseWeekReorderSerializer(data=request.data)
+        if not serializer.is_valid():
+            error_str = handle_serializer_errors(serializer)
+            raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            apply_order(CourseWeek, {'course_id': course_id}, serializer.validated_data['week_ids'])
+        except ValueError as e:
+            raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+        return format_success_response(message="Course weeks reordered successfully")
+
+
 @extend_schema(tags=["Class Sessions"])
 class ClassSessionListCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -238,39 +229,25 @@ class ClassSessionListCreateView(APIView):
                 error_str = handle_serializer_errors(serializer)
                 raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
 
-            session_number = serializer.validated_data.get('session_number')
-            weekday = serializer.validated_data.get('weekday')
-            if session_number and weekday:
-                # Sequential validation: all sessions 1..N-1 must exist for the given weekday
-                existing_numbers = set(
-                    CourseClassSession.objects.filter(course_week=week, weekday=weekday).values_list('session_number', flat=True)
+            session_number = serializer.validated_data.pop('session_number', None)
+            with transaction.atomic():
+                session = CourseClassSession(
+                    course_week=week,
+                    uploaded_by=request.user,
+                    **serializer.validated_data
                 )
-                if session_number in existing_numbers:
-                    raise ServiceError(
-                        detail=f"Session {session_number} already exists for {weekday.capitalize()}.",
-                        status_code=status.HTTP_400_BAD_REQUEST
-                    )
-                missing = [i for i in range(1, session_number) if i not in existing_numbers]
-                if missing:
-                    missing_str = ', '.join(str(m) for m in missing)
-                    raise ServiceError(
-                        detail=f"Session {missing_str} for {weekday.capitalize()} must be created first before adding Session {session_number}.",
-                        status_code=status.HTTP_400_BAD_REQUEST
-                    )
-
-            session = CourseClassSession.objects.create(
-                course_week=week,
-                uploaded_by=request.user,
-                **serializer.validated_data
-            )
+                lock_ordering_parent(session)
+                # Inserting between two sessions only writes the new row
+                place_session(session, session_number)
+                session.save()
             response_serializer = CourseClassSessionSerializer(session, context={'request': request})
             return format_success_response(
                 message="Class session created successfully", 
                 data=response_serializer.data, 
                 status_code=status.HTTP_201_CREATED
             )
-        except IntegrityError:
-            raise ServiceError(detail="A session with this number already exists for this week.", status_code=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
         except ServiceError:
             raise
         except Exception as e:
@@ -285,7 +262,7 @@ class ClassSessionDetailView(APIView):
 
     def get_object(self, course_id, week_id, session_id):
         try:
-            return CourseClassSession.objects.get(id=session_id, course_week_id=week_id, course_week__course_id=course_id)
+            return CourseClassSession.objects.with_session_numbers().get(id=session_id, course_week_id=week_id, course_week__course_id=course_id)
         except CourseClassSession.DoesNotExist:
             raise ServiceError(detail="Class session not found.", status_code=status.HTTP_404_NOT_FOUND)
 
@@ -318,52 +295,29 @@ class ClassSessionDetailView(APIView):
             raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
 
         try:
-            new_session_number = serializer.validated_data.get('session_number')
-            old_session_number = session.session_number
-            new_weekday = serializer.validated_data.get('weekday')
-            old_weekday = session.weekday
-            final_weekday = new_weekday if new_weekday else old_weekday
-            
-            occupying_session = None
+            with transaction.atomic():
+                lock_ordering_parent(session)
+                new_session_number = serializer.validated_data.pop('session_number', None)
+                new_weekday = serializer.validated_data.get('weekday')
 
-            if (new_session_number and new_session_number != old_session_number) or (new_weekday and new_weekday != old_weekday):
-                max_existing = CourseClassSession.objects.filter(course_week=session.course_week, weekday=final_weekday).exclude(id=session.id).count()
-                if new_session_number and (new_session_number > max_existing + 1 or new_session_number < 1):
-                    raise ServiceError(
-                        detail=f"Session number must be between 1 and {max_existing + 1} for {final_weekday.capitalize()}.",
-                        status_code=status.HTTP_400_BAD_REQUEST
-                    )
-                try:
-                    target_session_number = new_session_number if new_session_number else old_session_number
-                    occupying_session = CourseClassSession.objects.get(
-                        course_week=session.course_week,
-                        weekday=final_weekday,
-                        session_number=target_session_number
-                    )
-                    from django.db.models import Max as _Max
-                    current_max = CourseClassSession.objects.filter(course_week=session.course_week, weekday=final_weekday).aggregate(m=_Max('session_number'))['m'] or 0
-                    safe_temp = current_max + 9999
-                    CourseClassSession.objects.filter(id=occupying_session.id).update(session_number=safe_temp)
-                except CourseClassSession.DoesNotExist:
-                    pass
+                if (new_session_number and new_session_number != session.visible_number) or (new_weekday and new_weekday != session.weekday):
+                    # Moving only rewrites this session's order key
+                    place_session(session, new_session_number, new_weekday)
+
+                for attr, value in serializer.validated_data.items():
+                    setattr(session, attr, value)
+
+                if request.data.get('remove_thumbnail') == 'true':
+                    if session.thumbnail:
+                        session.thumbnail.delete(save=False)
+                    session.thumbnail = None
+
+                session.save()
 
-            for attr, value in serializer.validated_data.items():
-                setattr(session, attr, value)
-                
-            if request.data.get('remove_thumbnail') == 'true':
-                if session.thumbnail:
-                    session.thumbnail.delete(save=False)
-                session.thumbnail = None
-                
-            session.save()
-
-            if occupying_session is not None:
-                CourseClassSession.objects.filter(id=occupying_session.id).update(session_number=old_session_number)
-            
             response_serializer = CourseClassSessionSerializer(session, context={'request': request})
             return format_success_response(message="Class session updated successfully", data=response_serializer.data)
-        except IntegrityError:
-            raise ServiceError(detail="A session with this number already exists for this week.", status_code=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
         except ServiceError:
             raise
         except Exception as e:
@@ -378,29 +332,10 @@ class ClassSessionDetailView(APIView):
             
         try:
             session = self.get_object(course_id, week_id, session_id)
-            course_week = session.course_week
-            deleted_session_number = session.session_number
-            video_file_key = session.video_file
-
+            # Later sessions keep their order keys, so nothing is renumbered;
+            # the post_delete signal queues the video key for the storage GC worker.
             session.delete()
 
-            # Re-order subsequent sessions to fill the gap left by the deleted session.
-            # E.g., if Session 2 is deleted from [1, 2, 3], Session 3 becomes 2.
-            subsequent_sessions = CourseClassSession.objects.filter(
-                course_week=course_week,
-                weekday=session.weekday,
-                session_number__gt=deleted_session_number
-            ).order_by('session_number')
-
-            for subsequent_session in subsequent_sessions:
-                # Direct update to bypass save signals/unique constraints during the loop
-                CourseClassSession.objects.filter(id=subsequent_session.id).update(
-                    session_number=subsequent_session.session_number - 1
-                )
-
-            if video_file_key:
-                delete_unused_video_from_storage(video_file_key)
-
             return format_success_response(message="Class session deleted successfully")
         except ServiceError:
             raise
@@ -409,6 +344,31 @@ class ClassSessionDetailView(APIView):
             raise ServiceError(detail="An error occurred while deleting the class session.", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema(tags=["Class Sessions"])
+class ClassSessionReorderView(APIView):
+    permission_classes = [IsSuperAdminAdminOrTeacher]
+
+    @extend_schema(
+        summary="Reorder all sessions of a week on one weekday",
+        request=ClassSessionReorderSerializer,
+        responses={200: None}
+    )
+    def put(self, request, course_id, week_id):
+        if not CourseWeek.objects.filter(id=week_id, course_id=course_id).exists():
+            raise ServiceError(detail="Course week not found.", status_code=status.HTTP_404_NOT_FOUND)
+        serializer = ClassSessionReorderSerializer(data=request.data)
+        if not serializer.is_valid():
+            error_str = handle_serializer_errors(serializer)
+            raise ServiceError(detail=error_str, status_code=status.HTTP_400_BAD_REQUEST)
+
+        scope = {'course_week_id': week_id, 'weekday': serializer.validated_data['weekday']}
+        try:
+            apply_order(CourseClassSession, scope, serializer.validated_data['session_ids'])
+        except ValueError as e:
+            raise ServiceError(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+        return format_success_response(message="Class sessions reordered successfully")
+
+
 @extend_schema(tags=["Weekly Tests"])
 class WeeklyTestView(APIView):
     permission_classes = [IsAuthenticated]
@@ -16,6 +16,7 @@ from utils.permissions import IsSuperAdminAdminOrTeacher, IsSuperAdminOrAdmin, I
 from utils.common import format_success_response, handle_serializer_errors, ServiceError
 from utils.pagination import CustomPageNumberPagination
 from utils.constants import UserTypeConstants
+from apps.courses.services import sync_course_content_to_batches
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +37,9 @@ class CourseListView(APIView):
         responses={200: CourseListSerializer(many=True)},
     )
     def get(self, request):
-        qs = Course.objects.prefetch_related('tags').order_by('-created_at')
-
         user = request.user
+        qs = Course.objects.prefetch_related('tags').with_enrolled_batch(user).order_by('-created_at')
+
         if getattr(user, 'user_type', None):
             if user.user_type.name == UserTypeConstants.TEACHER:
                 qs = qs.filter(
@@ -125,7 +126,7 @@ class CourseDetailView(APIView):
                         batches__enrollments__student=user
                     ).distinct()
 
-            return qs.prefetch_related('tags').get(pk=pk)
+            return qs.prefetch_related('tags').with_enrolled_batch(user).get(pk=pk)
         except Course.DoesNotExist:
             raise ServiceError(detail="Course not found or you do not have permission to view it.", status_code=status.HTTP_404_NOT_FOUND)
 
@@ -244,3 +245,39 @@ class CourseToggleActiveView(APIView):
         except Exception as e:
             logger.error(f"Error toggling course active status: {str(e)}")
             raise ServiceError(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@extend_schema(tags=["Courses"])
+class CourseContentSyncView(APIView):
+    permission_classes = [IsSuperAdminAdminOrTeacher]
+
+    @extend_schema(
+        summary="Sync course content edits to all batches of the course",
+        description="Pushes course weeks, sessions, tests and questions changed since each batch's "
+                    "last sync to every batch of the course (or only the given batch_ids).",
+        request=None,
+        parameters=[
+            OpenApiParameter("batch_ids", OpenApiTypes.STR, description="Optional comma-separated batch IDs"),
+        ],
+        responses={200: None},
+    )
+    def post(self, request, pk):
+        if not Course.objects.filter(pk=pk).exists():
+            raise ServiceError(detail="Course not found.", status_code=status.HTTP_404_NOT_FOUND)
+
+        batch_ids = request.query_params.get('batch_ids')
+        try:
+            if batch_ids:
+                batch_ids = [int(batch_id) for batch_id in batch_ids.split(',') if batch_id.strip()]
+        except ValueError:
+            raise ServiceError(detail="batch_ids must be a comma-separated list of IDs.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            summary = sync_course_content_to_batches(pk, batch_ids=batch_ids or None)
+            return format_success_response(
+                message=f"Course content synced to {summary['batches']} batch(es)",
+                data=summary,
+            )
+        except Exception as e:
+            logger.error(f"Error syncing course content: {str(e)}")
+            raise ServiceError(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,27 +1,103 @@
-import boto3
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.utils.crypto import get_random_string
+from django.utils import timezone
 import mimetypes
 import logging
+from botocore.exceptions import ClientError
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes, inline_serializer
 from rest_framework import serializers
 
 from utils.constants import UserTypeConstants
 from utils.common import format_success_response, ServiceError
+from utils.storage import get_s3_client, presign
+from apps.courses.models import UploadSession, StoredObject, StorageDeletion
 
 logger = logging.getLogger(__name__)
 
-def get_s3_client():
-    return boto3.client(
-        's3',
-        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'auto'),
-    )
+MAX_UPLOAD_PARTS = 10000
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3/R2 minimum for every part except the last
+PART_URL_EXPIRES_IN = 86400  # 24 hours
+
+
+def choose_upload_plan(file_size):
+    """
+    Picks the part size and a client concurrency hint for an upload of
+    `file_size` bytes from the UPLOAD_PART_SIZE_POLICY setting.
+
+    Larger files get larger parts so multi-GB lectures need fewer round trips;
+    the part size is always at least the S3 minimum and large enough to stay
+    within the 10000-part limit.
+    """
+    policy = settings.UPLOAD_PART_SIZE_POLICY
+    part_size, concurrency = policy[-1][1], policy[-1][2]
+    for max_size, tier_part_size, tier_concurrency in policy:
+        if max_size is None or file_size <= max_size:
+            part_size, concurrency = tier_part_size, tier_concurrency
+            break
+
+    min_for_limit = (file_size + MAX_UPLOAD_PARTS - 1) // MAX_UPLOAD_PARTS
+    part_size = max(part_size, MIN_PART_SIZE, min_for_limit)
+    return part_size, concurrency
+
+
+def get_part_url_window():
+    return getattr(settings, 'UPLOAD_PART_URL_WINDOW', 50)
+
+
+def presign_part_urls(key, upload_id, part_numbers):
+    """
+    Presigns upload_part URLs for the given part numbers, in order.
+    """
+    part_urls = []
+    for part_num in part_numbers:
+        url = presign(
+            key,
+            method='upload_part',
+            expires_in=PART_URL_EXPIRES_IN,
+            params={'UploadId': upload_id, 'PartNumber': part_num},
+        )
+        if url is None:
+            raise RuntimeError(f"Could not presign part {part_num} of {key}")
+        part_urls.append(url)
+    return part_urls
+
+
+def list_uploaded_parts(key, upload_id):
+    """
+    Returns every part S3 already holds for an upload (ListParts, all pages).
+    """
+    paginator = get_s3_client().get_paginator('list_parts')
+    parts = []
+    for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key, UploadId=upload_id):
+        for part in page.get('Parts', []):
+            parts.append({'PartNumber': part['PartNumber'], 'ETag': part['ETag'], 'Size': part['Size']})
+    return parts
+
+
+def get_owned_upload_session(user, key, upload_id):
+    try:
+        return UploadSession.objects.get(
+            key=key, upload_id=upload_id, owner=user,
+            status=UploadSession.Status.IN_PROGRESS
+        )
+    except UploadSession.DoesNotExist:
+        raise ServiceError(detail="Upload session not found.", status_code=status.HTTP_404_NOT_FOUND)
+
+def storage_content_hash(etag, file_size):
+    """
+    Content fingerprint for upload deduplication, built only from what
+    storage reports: the object's multipart ETag (MD5 of the part MD5s plus
+    "-<part count>") and the file size. The part size is derived from the
+    file size (choose_upload_plan), so the same file uploaded twice produces
+    the same value. Client-supplied hashes are never trusted.
+    """
+    if not etag:
+        return None
+    return f'etag:{etag.strip(chr(34))}:{file_size}'
+
 
 class InitUploadSerializer(serializers.Serializer):
     filename = serializers.CharField(max_length=255)
@@ -41,6 +117,24 @@ class AbortUploadSerializer(serializers.Serializer):
     key = serializers.CharField()
     upload_id = serializers.CharField()
 
+class UploadPartUrlsSerializer(serializers.Serializer):
+    key = serializers.CharField()
+    upload_id = serializers.CharField()
+    start_part = serializers.IntegerField(min_value=1, max_value=MAX_UPLOAD_PARTS, required=False)
+    count = serializers.IntegerField(min_value=1, required=False)
+    part_numbers = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_UPLOAD_PARTS),
+        required=False, allow_empty=False
+    )
+
+    def validate(self, attrs):
+        if 'start_part' not in attrs and 'part_numbers' not in attrs:
+            raise serializers.ValidationError("Either start_part or part_numbers is required.")
+        return attrs
+
+class ResumeUploadSerializer(serializers.Serializer):
+    upload_id = serializers.CharField()
+
 @extend_schema(tags=["Uploads"])
 class InitMultipartUploadView(APIView):
     permission_classes = [IsAuthenticated]
@@ -54,7 +148,10 @@ class InitMultipartUploadView(APIView):
                 "upload_id": serializers.CharField(),
                 "key": serializers.CharField(),
                 "part_urls": serializers.ListField(child=serializers.CharField()),
-                "chunk_size": serializers.IntegerField()
+                "chunk_size": serializers.IntegerField(),
+                "total_parts": serializers.IntegerField(),
+                "part_url_window": serializers.IntegerField(),
+                "concurrency": serializers.IntegerField(),
             }
         )}
     )
@@ -84,10 +181,10 @@ class InitMultipartUploadView(APIView):
         random_str = get_random_string(16)
         key = f"class_videos/{user.id}_{random_str}.{ext}"
 
-        chunk_size = 10 * 1024 * 1024 # 10MB chunks (min 5MB for S3/R2 multipart upload)
-        num_parts = (file_size + chunk_size - 1) // chunk_size
+        chunk_size, concurrency = choose_upload_plan(file_size)
+        num_parts = max(1, (file_size + chunk_size - 1) // chunk_size)
 
-        if num_parts > 10000:
+        if num_parts > MAX_UPLOAD_PARTS:
             raise ServiceError(detail="File too large (exceeds max parts limit).", status_code=status.HTTP_400_BAD_REQUEST)
 
         try:
@@ -103,20 +200,21 @@ class InitMultipartUploadView(APIView):
             )
             upload_id = init_resp['UploadId']
 
-            # Generate presigned URLs for each part
-            part_urls = []
-            for part_num in range(1, num_parts + 1):
-                url = s3_client.generate_presigned_url(
-                    ClientMethod='upload_part',
-                    Params={
-                        'Bucket': bucket_name,
-                        'Key': key,
-                        'UploadId': upload_id,
-                        'PartNumber': part_num
-                    },
-                    ExpiresIn=86400 # 24 hours
-                )
-                part_urls.append(url)
+            # Only the first window of part URLs is signed up front; the client
+            # fetches the rest from the part-urls endpoint as it moves forward.
+            window = get_part_url_window()
+            part_urls = presign_part_urls(key, upload_id, range(1, min(window, num_parts) + 1))
+
+            UploadSession.objects.create(
+                key=key,
+                upload_id=upload_id,
+                owner=user,
+                filename=filename,
+                content_type=file_type,
+                file_size=file_size,
+                part_size=chunk_size,
+                total_parts=num_parts,
+            )
 
             return format_success_response(
                 message="Multipart upload initialized",
@@ -125,6 +223,9 @@ class InitMultipartUploadView(APIView):
                     "key": key,
                     "part_urls": part_urls,
                     "chunk_size": chunk_size,
+                    "total_parts": num_parts,
+                    "part_url_window": window,
+                    "concurrency": concurrency,
                 }
             )
 
@@ -132,6 +233,142 @@ class InitMultipartUploadView(APIView):
             logger.error(f"Failed to initialize multipart upload: {str(e)}")
             raise ServiceError(detail="Failed to communicate with storage server.", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@extend_schema(tags=["Uploads"])
+class UploadPartUrlsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Presign the next window of part URLs for a multipart upload",
+        request=UploadPartUrlsSerializer,
+        responses={200: inline_serializer(
+            name="UploadPartUrlsResponse",
+            fields={
+                "start_part": serializers.IntegerField(),
+                "part_urls": serializers.ListField(child=serializers.CharField()),
+            }
+        )}
+    )
+    def post(self, request):
+        user = request.user
+        if getattr(user, 'user_type', None) and user.user_type.name not in [UserTypeConstants.ADMIN, UserTypeConstants.SUPERADMIN, UserTypeConstants.TEACHER]:
+            raise ServiceError(detail="You do not have permission to perform this action.", status_code=status.HTTP_403_FORBIDDEN)
+
+        serializer = UploadPartUrlsSerializer(data=request.data)
+        if not serializer.is_valid():
+            raise ServiceError(detail="Invalid data format.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        key = serializer.validated_data['key']
+        upload_id = serializer.validated_data['upload_id']
+        upload = get_owned_upload_session(user, key, upload_id)
+        window = get_part_url_window()
+
+        if 'part_numbers' in serializer.validated_data:
+            part_numbers = sorted(set(serializer.validated_data['part_numbers']))[:window]
+            start_part = part_numbers[0]
+        else:
+            start_part = serializer.validated_data['start_part']
+            count = min(serializer.validated_data.get('count', window), window)
+            part_numbers = list(range(start_part, min(start_part + count - 1, upload.total_parts) + 1))
+
+        if not part_numbers or part_numbers[-1] > upload.total_parts:
+            raise ServiceError(detail="Requested parts are beyond the last part of this upload.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            part_urls = presign_part_urls(key, upload_id, part_numbers)
+            # Activity keeps the upload away from the stale upload reaper
+            UploadSession.objects.filter(pk=upload.pk).update(updated_at=timezone.now())
+            return format_success_response(
+                message="Part URLs generated",
+                data={"start_part": start_part, "part_numbers": part_numbers, "part_urls": part_urls}
+            )
+        except Exception as e:
+            logger.error(f"Failed to presign part URLs: {str(e)}")
+            raise ServiceError(detail="Failed to communicate with storage server.", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(tags=["Uploads"])
+class ResumeMultipartUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Resume an in-progress multipart upload",
+        description="Looks up the caller's upload by upload_id, syncs the completed parts from S3 ListParts "
+                    "and returns only the parts still missing. Answers 410 when the upload no longer exists "
+                    "in storage (aborted or reaped); the client should start a new one.",
+        request=ResumeUploadSerializer,
+        responses={200: inline_serializer(
+            name="ResumeUploadResponse",
+            fields={
+                "upload_id": serializers.CharField(),
+                "key": serializers.CharField(),
+                "chunk_size": serializers.IntegerField(),
+                "total_parts": serializers.IntegerField(),
+                "completed_parts": serializers.ListField(child=serializers.DictField()),
+                "missing_parts": serializers.ListField(child=serializers.IntegerField()),
+                "part_numbers": serializers.ListField(child=serializers.IntegerField()),
+                "part_urls": serializers.ListField(child=serializers.CharField()),
+                "part_url_window": serializers.IntegerField(),
+                "concurrency": serializers.IntegerField(),
+            }
+        )}
+    )
+    def post(self, request):
+        user = request.user
+        serializer = ResumeUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            raise ServiceError(detail="Invalid data format.", status_code=status.HTTP_400_BAD_REQUEST)
+
+        # Matched on upload_id only: a filename/size match could splice
+        # another file's parts into this upload
+        upload = UploadSession.objects.filter(
+            owner=user, status=UploadSession.Status.IN_PROGRESS,
+            upload_id=serializer.validated_data['upload_id'],
+        ).order_by('-created_at').first()
+        if upload is None:
+            raise ServiceError(detail="No resumable upload found.", status_code=status.HTTP_404_NOT_FOUND)
+
+        try:
+            try:
+                upload.completed_parts = list_uploaded_parts(upload.key, upload.upload_id)
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+                    raise
+                upload.status = UploadSession.Status.ABORTED
+                upload.save(update_fields=['status', 'updated_at'])
+                raise ServiceError(
+                    detail="This upload no longer exists in storage; please start a new upload.",
+                    status_code=status.HTTP_410_GONE
+                )
+            upload.save(update_fields=['completed_parts', 'updated_at'])
+
+            missing = upload.missing_part_numbers
+            window = get_part_url_window()
+            part_numbers = missing[:window]
+            part_urls = presign_part_urls(upload.key, upload.upload_id, part_numbers)
+
+            return format_success_response(
+                message="Upload can be resumed",
+                data={
+                    "upload_id": upload.upload_id,
+                    "key": upload.key,
+                    "chunk_size": upload.part_size,
+                    "total_parts": upload.total_parts,
+                    "completed_parts": [
+                        {"ETag": part['ETag'], "PartNumber": part['PartNumber']}
+                        for part in upload.completed_parts
+                    ],
+                    "missing_parts": missing,
+                    "part_numbers": part_numbers,
+                    "part_urls": part_urls,
+                    "part_url_window": window,
+                    "concurrency": choose_upload_plan(upload.file_size)[1],
+                }
+            )
+        except ServiceError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to resume multipart upload {upload.upload_id}: {str(e)}")
+            raise ServiceError(detail="Failed to communicate with storage server.", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @extend_schema(tags=["Uploads"])
 class CompleteMultipartUploadView(APIView):
     permission_classes = [IsAuthenticated]
@@ -142,7 +379,9 @@ class CompleteMultipartUploadView(APIView):
         responses={200: inline_serializer(
             name="CompleteUploadResponse",
             fields={
-                "video_url": serializers.CharField()
+                "video_url": serializers.CharField(),
+                "video_key": serializers.CharField(),
+                "deduplicated": serializers.BooleanField(),
             }
         )}
     )
@@ -154,17 +393,37 @@ class CompleteMultipartUploadView(APIView):
         key = serializer.validated_data['key']
         upload_id = serializer.validated_data['upload_id']
         parts = serializer.validated_data['parts']
+        upload = get_owned_upload_session(request.user, key, upload_id)
 
         try:
             s3_client = get_s3_client()
             bucket_name = settings.AWS_STORAGE_BUCKET_NAME
 
-            s3_client.complete_multipart_upload(
+            completed = s3_client.complete_multipart_upload(
                 Bucket=bucket_name,
                 Key=key,
                 UploadId=upload_id,
                 MultipartUpload={'Parts': parts}
             )
+            UploadSession.objects.filter(pk=upload.pk).update(
+                status=UploadSession.Status.COMPLETED,
+                completed_parts=[{'PartNumber': p['PartNumber'], 'ETag': p['ETag']} for p in parts],
+                updated_at=timezone.now(),
+            )
+
+            # Deduplicate by the ETag storage computed for the object. The
+            # existing copy is leased so the storage GC keeps it until the
+            # new session referencing it is saved.
+            content_hash = storage_content_hash(completed.get('ETag'), upload.file_size)
+            deduplicated = False
+            existing_key = StoredObject.objects.lease_by_content_hash(content_hash, exclude_key=key)
+            if existing_key:
+                StorageDeletion.objects.enqueue([key])
+                logger.info(f"Upload {key} duplicates {existing_key}; discarding the new copy")
+                key = existing_key
+                deduplicated = True
+            elif content_hash:
+                StoredObject.objects.record_content_hash(key, content_hash)
 
             # Note: We will handle the database saving locally when the video is created, 
             # this just returns the successful URL/Key.
@@ -177,7 +436,7 @@ class CompleteMultipartUploadView(APIView):
 
             return format_success_response(
                 message="Upload completed successfully",
-                data={"video_url": video_url, "video_key": key}
+                data={"video_url": video_url, "video_key": key, "deduplicated": deduplicated}
             )
         except Exception as e:
             logger.error(f"Failed to complete multipart upload: {str(e)}")
@@ -199,6 +458,7 @@ class AbortMultipartUploadView(APIView):
 
         key = serializer.validated_data['key']
         upload_id = serializer.validated_data['upload_id']
+        upload = get_owned_upload_session(request.user, key, upload_id)
 
         try:
             s3_client = get_s3_client()
@@ -207,6 +467,10 @@ class AbortMultipartUploadView(APIView):
                 Key=key,
                 UploadId=upload_id
             )
+            UploadSession.objects.filter(pk=upload.pk).update(
+                status=UploadSession.Status.ABORTED,
+                updated_at=timezone.now(),
+            )
             return format_success_response(message="Upload aborted successfully.")
         except Exception as e:
             logger.error(f"Failed to abort multipart upload: {str(e)}")
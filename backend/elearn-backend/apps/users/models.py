@@ -1,4 +1,3 @@
-import uuid
 import random
 from datetime import timedelta
 from django.db import models
@@ -9,6 +8,7 @@ from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from utils.codes import user_codes
 from utils.constants import UserTypeConstants
 
 
@@ -148,11 +148,8 @@ class User(AbstractBaseUser, PermissionsMixin):
         self.save()
     
     def generate_user_code(self):
-        """Generate a unique user code."""
-        while True:
-            code = f"USR{uuid.uuid4().hex[:8].upper()}"
-            if not User.objects.filter(user_code=code).exists():
-                return code
+        """Generate a unique user code (no lookup, see utils.codes)."""
+        return user_codes.next()
 
     def soft_delete(self, deleted_by_user=None):
         import time
@@ -157,7 +157,60 @@ AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
 AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')
 AWS_S3_CUSTOM_DOMAIN = os.getenv('AWS_S3_CUSTOM_DOMAIN')
+# When set together with AWS_S3_CUSTOM_DOMAIN, video URLs are signed locally
+# with the CDN's HMAC token scheme instead of S3 SigV4 presigning.
+CDN_URL_SIGNING_KEY = os.getenv('CDN_URL_SIGNING_KEY')
+CDN_URL_TOKEN_PARAM = os.getenv('CDN_URL_TOKEN_PARAM', 'verify')
 AWS_S3_SIGNATURE_VERSION = 's3v4'
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_S3_MAX_POOL_CONNECTIONS', 50))
+
+# Presigned URL cache: URLs signed within the same bucket are reused until
+# less than the safety margin of their lifetime is left.
+PRESIGNED_URL_CACHE_SIZE = int(os.getenv('PRESIGNED_URL_CACHE_SIZE', 10000))
+PRESIGNED_URL_BUCKET_SECONDS = int(os.getenv('PRESIGNED_URL_BUCKET_SECONDS', 3600))
+PRESIGNED_URL_SAFETY_MARGIN = float(os.getenv('PRESIGNED_URL_SAFETY_MARGIN', 0.25))
+
+# Number of multipart part URLs presigned per request (init + part-urls endpoint)
+UPLOAD_PART_URL_WINDOW = int(os.getenv('UPLOAD_PART_URL_WINDOW', 50))
+
+# Multipart part-size policy: (max file size in bytes or None, part size, client concurrency hint).
+# The first tier the file fits in is used.
+UPLOAD_PART_SIZE_POLICY = [
+    (512 * 1024 * 1024, 10 * 1024 * 1024, 4),
+    (2 * 1024 * 1024 * 1024, 32 * 1024 * 1024, 4),
+    (None, 64 * 1024 * 1024, 6),
+]
+
+# Stale multipart upload reaper (manage.py reap_stale_uploads)
+STALE_UPLOAD_MAX_AGE_HOURS = int(os.getenv('STALE_UPLOAD_MAX_AGE_HOURS', 24))
+STALE_UPLOAD_REAP_BATCH_SIZE = int(os.getenv('STALE_UPLOAD_REAP_BATCH_SIZE', 100))
+STALE_UPLOAD_REAP_WORKERS = int(os.getenv('STALE_UPLOAD_REAP_WORKERS', 8))
+
+# Background content clone jobs (manage.py run_clone_jobs)
+CLONE_JOB_WEEKS_PER_STEP = int(os.getenv('CLONE_JOB_WEEKS_PER_STEP', 4))
+# A RUNNING job whose heartbeat is older than this is treated as orphaned
+# (crashed worker) and handed to the next worker
+CLONE_JOB_STALE_SECONDS = int(os.getenv('CLONE_JOB_STALE_SECONDS', 15 * 60))
+
+# Course -> batch content sync. The watermark is stored this far behind the
+# sync's start, so rows saved by transactions still open when the sync read
+# the course are picked up by the next sync (re-applying a row is a no-op)
+COURSE_SYNC_WATERMARK_MARGIN_SECONDS = int(os.getenv('COURSE_SYNC_WATERMARK_MARGIN_SECONDS', 5 * 60))
+
+# Push course weeks/sessions to batches as copy-on-write links instead of copies
+BATCH_CONTENT_COPY_ON_WRITE = os.getenv('BATCH_CONTENT_COPY_ON_WRITE', 'False') == 'True'
+
+# Storage GC worker (manage.py process_storage_deletions)
+STORAGE_GC_BATCH_SIZE = int(os.getenv('STORAGE_GC_BATCH_SIZE', 1000))
+STORAGE_GC_MAX_ATTEMPTS = int(os.getenv('STORAGE_GC_MAX_ATTEMPTS', 8))
+STORAGE_GC_RETRY_BASE_SECONDS = int(os.getenv('STORAGE_GC_RETRY_BASE_SECONDS', 30))
+STORAGE_GC_RETRY_MAX_SECONDS = int(os.getenv('STORAGE_GC_RETRY_MAX_SECONDS', 6 * 3600))
+# How long an object handed out by upload deduplication is kept without a session referencing it
+STORAGE_GC_DEDUP_LEASE_SECONDS = int(os.getenv('STORAGE_GC_DEDUP_LEASE_SECONDS', 24 * 3600))
+
+# Course/batch/user codes reserved per database round trip (utils/codes.py)
+CODE_BLOCK_SIZE = int(os.getenv('CODE_BLOCK_SIZE', 100))
+
 AWS_S3_FILE_OVERWRITE = False
 AWS_S3_OBJECT_PARAMETERS = {
     'CacheControl': 'max-age=86400',
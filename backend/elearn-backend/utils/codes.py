@@ -0,0 +1,109 @@
+"""
+Collision-free public codes (course_code, batch_code, user_code).
+
+Each kind of code has its own PostgreSQL sequence that steps by
+CODE_BLOCK_SIZE, so one nextval() reserves a whole block of numbers for the
+calling process; codes are then served from memory without touching the
+database. nextval() is never rolled back, so a block cannot be handed out
+twice even when the transaction that reserved it fails. The sequence itself
+is created lazily on its own autocommit connection (see _block_size), never
+inside the caller's transaction.
+
+Numbers go through a bijection on [0, 16 ** digits) (odd multiplier, then
+an xorshift) so consecutive codes do not look sequential, and are rendered
+as `digits` uppercase hex characters. New codes are one character longer
+than the legacy random ones, so the two can never collide.
+
+Other database backends (local SQLite settings) get random codes of the
+same shape without the uniqueness guarantee.
+"""
+import secrets
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, connection, connections
+
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_INCREMENT = 0x2545F4914F6CDD1D
+
+
+class CodeAllocator:
+    def __init__(self, prefix, digits, sequence):
+        self.prefix = prefix
+        self.digits = digits
+        self.sequence = sequence
+        self._bits = digits * 4
+        self._mask = (1 << self._bits) - 1
+        self._pending = []
+        self._block = None
+        self._lock = threading.Lock()
+
+    def _scramble(self, number):
+        if number > self._mask:
+            raise OverflowError(f"{self.sequence} is exhausted for {self.digits}-digit codes.")
+        value = (number * _MULTIPLIER + _INCREMENT) & self._mask
+        return value ^ (value >> (self._bits // 2))
+
+    def _format(self, number):
+        return f"{self.prefix}{self._scramble(number):0{self.digits}X}"
+
+    def _block_size(self):
+        """
+        Creates the sequence on first use and returns its step, which is the
+        block size. The CREATE runs on a separate autocommit connection, so
+        the sequence exists (committed) before any number is drawn from it
+        and a rollback of the caller's transaction cannot drop it; nothing is
+        cached until then.
+        """
+        if self._block is None:
+            setup = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                with setup.cursor() as cursor:
+                    try:
+                        cursor.execute(
+                            f"CREATE SEQUENCE IF NOT EXISTS {self.sequence} "
+                            f"INCREMENT BY {settings.CODE_BLOCK_SIZE} MINVALUE 0 START WITH 0"
+                        )
+                    except IntegrityError:
+                        pass  # created concurrently by another process
+                    # An existing sequence keeps its step even if CODE_BLOCK_SIZE changed since
+                    cursor.execute(
+                        "SELECT increment_by FROM pg_sequences "
+                        "WHERE schemaname = current_schema() AND sequencename = %s",
+                        [self.sequence],
+                    )
+                    row = cursor.fetchone()
+            finally:
+                setup.close()
+            if row is None:
+                raise DatabaseError(f"Sequence {self.sequence} could not be created.")
+            self._block = row[0]
+        return self._block
+
+    def _reserve(self, count):
+        """Reserves enough blocks for `count` codes with a single nextval() round trip."""
+        block_size = self._block_size()
+        blocks = -(-count // block_size)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT nextval('{self.sequence}') FROM generate_series(1, %s)", [blocks])
+            starts = sorted(row[0] for row in cursor.fetchall())
+        for start in starts:
+            self._pending.extend(range(start, start + block_size))
+
+    def allocate(self, count=1):
+        """Returns `count` unused codes (bulk imports should ask for all of them at once)."""
+        if connection.vendor != 'postgresql':
+            return [self._format(secrets.randbelow(self._mask + 1)) for _ in range(count)]
+        with self._lock:
+            if len(self._pending) < count:
+                self._reserve(count - len(self._pending))
+            numbers, self._pending = self._pending[:count], self._pending[count:]
+        return [self._format(number) for number in numbers]
+
+    def next(self):
+        return self.allocate(1)[0]
+
+
+course_codes = CodeAllocator('CRS', digits=7, sequence='course_code_seq')
+batch_codes = CodeAllocator('BAT', digits=7, sequence='batch_code_seq')
+user_codes = CodeAllocator('USR', digits=9, sequence='user_code_seq')
@@ -0,0 +1,44 @@
+"""
+Fractional (lexicographic) order keys.
+
+A key is a string over DIGITS that never ends in the smallest digit, so a new
+key can always be generated strictly between any two existing keys without
+renumbering anything else. Keys sort correctly with a plain string ORDER BY:
+they only use digits and lowercase letters, which every collation orders the
+same way as their code points.
+"""
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def key_between(before=None, after=None):
+    """
+    Returns a key sorting strictly after `before` and strictly before `after`.
+    Either bound may be None (start / end of the list).
+    """
+    before = before or ''
+    if after is not None and not before < after:
+        raise ValueError(f"Order key {before!r} must sort before {after!r}.")
+
+    key = ''
+    i = 0
+    while True:
+        lo = DIGITS.index(before[i]) if i < len(before) else 0
+        hi = DIGITS.index(after[i]) if after is not None else BASE
+        if hi - lo > 1:
+            return key + DIGITS[(lo + hi) // 2]
+        key += DIGITS[lo]
+        if hi - lo == 1:
+            # The prefix is already below `after`; only `before` bounds the rest
+            after = None
+        i += 1
+
+
+def keys_between(before=None, after=None, count=1):
+    """Returns `count` ascending keys between the bounds, spread evenly to keep them short."""
+    if count <= 0:
+        return []
+    middle = count // 2
+    key = key_between(before, after)
+    return keys_between(before, key, middle) + [key] + keys_between(key, after, count - middle - 1)
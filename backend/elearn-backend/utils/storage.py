@@ -0,0 +1,242 @@
+import base64
+import hashlib
+import hmac
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Default lifetime of presigned GET URLs for class videos (4 hours)
+VIDEO_URL_EXPIRES_IN = 14400
+
+_client = None
+_client_lock = threading.Lock()
+
+_cdn_signer = None
+_cdn_signer_lock = threading.Lock()
+
+_is_url_safe_key = re.compile(r'[A-Za-z0-9_.~/-]*\Z').match
+
+
+class PresignedURLCache:
+    """
+    Thread-safe LRU cache of presigned URLs keyed by (object key, method, expiry bucket).
+
+    Requests landing in the same bucket share one signed URL, which keeps the
+    URL stable for browser caching. An entry is never returned once less than
+    `safety_margin` of its lifetime is left, so clients always get enough time
+    to start (and seek within) a video.
+    """
+
+    def __init__(self, max_size=10000, bucket_seconds=3600, safety_margin=0.25):
+        self.max_size = max_size
+        self.bucket_seconds = bucket_seconds
+        self.safety_margin = safety_margin
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, key, method, expires_in, now):
+        return (key, method, expires_in, int(now // self.bucket_seconds))
+
+    def get(self, key, method, expires_in, now=None):
+        now = time.time() if now is None else now
+        cache_key = self._cache_key(key, method, expires_in, now)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            url, expires_at = entry
+            if expires_at - now < expires_in * self.safety_margin:
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return url
+
+    def set(self, key, method, expires_in, url, now=None):
+        now = time.time() if now is None else now
+        cache_key = self._cache_key(key, method, expires_in, now)
+        with self._lock:
+            self._entries[cache_key] = (url, now + expires_in)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+presigned_url_cache = PresignedURLCache(
+    max_size=getattr(settings, 'PRESIGNED_URL_CACHE_SIZE', 10000),
+    bucket_seconds=getattr(settings, 'PRESIGNED_URL_BUCKET_SECONDS', 3600),
+    safety_margin=getattr(settings, 'PRESIGNED_URL_SAFETY_MARGIN', 0.25),
+)
+
+
+class CDNURLSigner:
+    """
+    Builds expiring HMAC token URLs for the CDN in front of the bucket.
+
+    URL format: https://<domain>/<key>?<param>=<expires>-<token>, where
+    token = base64url(HMAC-SHA256(secret, "/<key>" + "<expires>")) without
+    padding. Expiry times are aligned to `bucket_seconds` so every request in
+    the same bucket gets the same URL and browsers can cache the video.
+
+    Signing is pure Python (no botocore); the keyed HMAC state is prepared once
+    and copied per key.
+    """
+
+    def __init__(self, domain, secret, param='verify', bucket_seconds=3600):
+        self.base_url = f'https://{domain.rstrip("/")}'
+        self.param = param
+        self.bucket_seconds = bucket_seconds
+        if isinstance(secret, str):
+            secret = secret.encode()
+        self._hmac = hmac.new(secret, digestmod=hashlib.sha256)
+
+    def expires_at(self, expires_in, now=None):
+        now = time.time() if now is None else now
+        bucket_start = int(now // self.bucket_seconds) * self.bucket_seconds
+        return bucket_start + expires_in
+
+    def _sign_path(self, path, expires):
+        mac = self._hmac.copy()
+        mac.update(f'{path}{expires}'.encode())
+        token = base64.urlsafe_b64encode(mac.digest()).rstrip(b'=').decode()
+        return f'{self.base_url}{path}?{self.param}={expires}-{token}'
+
+    def _path(self, key):
+        return '/' + (key if _is_url_safe_key(key) else quote(key))
+
+    def sign(self, key, expires_in=VIDEO_URL_EXPIRES_IN, now=None):
+        if not key:
+            return None
+        return self._sign_path(self._path(key), self.expires_at(expires_in, now))
+
+    def sign_many(self, keys, expires_in=VIDEO_URL_EXPIRES_IN, now=None):
+        expires = self.expires_at(expires_in, now)
+        urls = {}
+        for key in keys:
+            if key and key not in urls:
+                urls[key] = self._sign_path(self._path(key), expires)
+        return urls
+
+
+def get_cdn_signer():
+    """
+    Returns the shared CDN signer, or None when AWS_S3_CUSTOM_DOMAIN or
+    CDN_URL_SIGNING_KEY is not configured (fall back to SigV4 presigning).
+    """
+    global _cdn_signer
+    domain = getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
+    secret = getattr(settings, 'CDN_URL_SIGNING_KEY', None)
+    if not domain or not secret:
+        return None
+    if _cdn_signer is None:
+        with _cdn_signer_lock:
+            if _cdn_signer is None:
+                _cdn_signer = CDNURLSigner(
+                    domain,
+                    secret,
+                    param=getattr(settings, 'CDN_URL_TOKEN_PARAM', 'verify'),
+                    bucket_seconds=getattr(settings, 'PRESIGNED_URL_BUCKET_SECONDS', 3600),
+                )
+    return _cdn_signer
+
+
+def get_s3_client():
+    """
+    Returns the process-wide S3/R2 client.
+
+    The client is built once and shared by every thread; botocore clients are
+    thread-safe and keep their own connection pool, so endpoint and credential
+    resolution only happen on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(
+                    's3',
+                    endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'auto'),
+                    config=Config(
+                        signature_version='s3v4',
+                        max_pool_connections=getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 50),
+                    ),
+                )
+    return _client
+
+
+def reset_s3_client():
+    """Drops the shared client and signer so the next call rebuilds them (e.g. after a settings change)."""
+    global _client, _cdn_signer
+    with _client_lock:
+        _client = None
+    with _cdn_signer_lock:
+        _cdn_signer = None
+
+
+def presign(key, method='get_object', expires_in=VIDEO_URL_EXPIRES_IN, params=None):
+    """
+    Returns a presigned URL for a single object key, or None if signing fails.
+
+    Plain object URLs (no extra params) are served from the presigned URL
+    cache; per-part upload URLs are always signed fresh. GET URLs are signed
+    locally with the CDN token scheme when a CDN signing key is configured.
+    """
+    if not key:
+        return None
+    cacheable = not params
+    if cacheable and method == 'get_object':
+        signer = get_cdn_signer()
+        if signer:
+            return signer.sign(key, expires_in)
+    if cacheable:
+        url = presigned_url_cache.get(key, method, expires_in)
+        if url:
+            return url
+    try:
+        url = get_s3_client().generate_presigned_url(
+            ClientMethod=method,
+            Params={
+                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                'Key': key,
+                **(params or {}),
+            },
+            ExpiresIn=expires_in,
+        )
+    except Exception as e:
+        logger.error(f"Failed to presign {key}: {str(e)}")
+        return None
+    if cacheable:
+        presigned_url_cache.set(key, method, expires_in, url)
+    return url
+
+
+def presign_many(keys, method='get_object', expires_in=VIDEO_URL_EXPIRES_IN):
+    """
+    Presigns a batch of object keys with the shared client.
+
+    Returns a dict of key -> URL. Empty and duplicate keys are skipped, so
+    callers can pass the raw `video_file` values of a page of rows.
+    """
+    if method == 'get_object':
+        signer = get_cdn_signer()
+        if signer:
+            return signer.sign_many(keys, expires_in)
+    urls = {}
+    for key in keys:
+        if key and key not in urls:
+            urls[key] = presign(key, method=method, expires_in=expires_in)
+    return urls
@@ -25,6 +25,24 @@ export interface BatchSummary {
   total_students: number;
 }
 
+export interface CloneJob {
+  id: number;
+  target_batch: number;
+  source_course: number | null;
+  source_batch: number | null;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  total_weeks: number;
+  weeks_processed: number;
+  sessions_processed: number;
+  questions_processed: number;
+  progress_percent: number;
+  error: string;
+  created_at: string;
+  started_at: string | null;
+  heartbeat_at: string | null;
+  finished_at: string | null;
+}
+
 export interface Batch {
   id: number;
   batch_code: string;
@@ -38,6 +56,7 @@ export interface Batch {
   is_full: boolean;
   start_date: string | null;
   progress_percent: number;
+  weeks_count: number;
   status: 'ACTIVE' | 'COMPLETED';
   created_at: string;
   updated_at: string;
@@ -173,7 +192,7 @@ export const batchApi = {
   },
 
   cloneContent: async (batchId: number, sourceCourseId?: number, sourceBatchId?: number) => {
-    const response = await apiClient.post<{ success: boolean; message: string }>(
+    const response = await apiClient.post<{ success: boolean; message: string; data: CloneJob }>(
       `/api/courses/v1/batches/${batchId}/clone-content/`,
       {},
       { params: { source_course_id: sourceCourseId, source_batch_id: sourceBatchId } }
@@ -181,6 +200,20 @@ export const batchApi = {
     return response.data;
   },
 
+  getCloneJob: async (batchId: number, jobId: number) => {
+    const response = await apiClient.get<{ success: boolean; message: string; data: CloneJob }>(
+      `/api/courses/v1/batches/${batchId}/clone-jobs/${jobId}/`
+    );
+    return response.data;
+  },
+
+  retryCloneJob: async (batchId: number, jobId: number) => {
+    const response = await apiClient.post<{ success: boolean; message: string; data: CloneJob }>(
+      `/api/courses/v1/batches/${batchId}/clone-jobs/${jobId}/retry/`
+    );
+    return response.data;
+  },
+
   extendTimeline: async (batchId: number, days: number) => {
     const response = await apiClient.post<{ success: boolean; message: string }>(
       `/api/courses/v1/batches/${batchId}/extend-timeline/`,
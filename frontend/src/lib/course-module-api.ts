@@ -109,6 +109,11 @@ export const courseModuleApi = {
     return response.data;
   },
 
+  reorderWeeks: async (courseId: string | number, weekIds: number[]) => {
+    const response = await apiClient.put<ApiResponse<null>>(`/api/courses/v1/courses/${courseId}/weeks/reorder/`, { week_ids: weekIds });
+    return response.data;
+  },
+
   // --- SESSIONS ---
   createSession: async (courseId: string | number, weekId: string | number, formData: FormData) => {
     const response = await apiClient.post<ApiResponse<ClassSession>>(`/api/courses/v1/courses/${courseId}/weeks/${weekId}/sessions/`, formData, {
@@ -128,6 +133,11 @@ export const courseModuleApi = {
     const response = await apiClient.delete<ApiResponse<null>>(`/api/courses/v1/courses/${courseId}/weeks/${weekId}/sessions/${sessionId}/`);
     return response.data;
   },
+
+  reorderSessions: async (courseId: string | number, weekId: string | number, weekday: string, sessionIds: number[]) => {
+    const response = await apiClient.put<ApiResponse<null>>(`/api/courses/v1/courses/${courseId}/weeks/${weekId}/sessions/reorder/`, { weekday, session_ids: sessionIds });
+    return response.data;
+  },
   
   // --- TESTS ---
   createTest: async (courseId: string | number, weekId: string | number, formData: FormData) => {
@@ -190,6 +200,20 @@ export const courseModuleApi = {
     return response.data;
   },
 
+  resumeMultipartUpload: async (upload_id: string) => {
+    const response = await apiClient.post<ApiResponse<any>>(`/api/courses/v1/courses/upload/resume/`, {
+      upload_id
+    });
+    return response.data;
+  },
+
+  getUploadPartUrls: async (key: string, upload_id: string, part_numbers: number[]) => {
+    const response = await apiClient.post<ApiResponse<any>>(`/api/courses/v1/courses/upload/parts/`, {
+      key, upload_id, part_numbers
+    });
+    return response.data;
+  },
+
   completeMultipartUpload: async (key: string, upload_id: string, parts: { ETag: string, PartNumber: number }[]) => {
     const response = await apiClient.post<ApiResponse<any>>(`/api/courses/v1/courses/upload/complete/`, {
       key, upload_id, parts
@@ -425,6 +425,13 @@ export default function AdminBatches() {
         pushSourceType === 'batch' ? pushSourceId : undefined
       );
       if (res.success) {
+        // The push runs as a background job; poll until it finishes
+        let job = res.data;
+        while (job.status === 'queued' || job.status === 'running') {
+          await new Promise((resolve) => setTimeout(resolve, 2000));
+          job = (await batchApi.getCloneJob(pushTargetBatchId, job.id)).data;
+        }
+        if (job.status === 'failed') throw new Error(job.error || 'Failed to push content');
         toast({ title: 'Success', description: 'Content pushed successfully', variant: 'success' });
         setIsPushModalOpen(false);
         fetchBatches();
@@ -432,7 +439,7 @@ export default function AdminBatches() {
     } catch (err: any) {
       toast({
         title: 'Push Failed',
-        description: err.response?.data?.detail || 'Failed to push content',
+        description: err.response?.data?.detail || err.message || 'Failed to push content',
         variant: 'destructive',
       });
     } finally {
@@ -591,7 +598,7 @@ export default function AdminBatches() {
                           <span className="text-muted-foreground">Progress</span>
                           <div className="flex items-center gap-1 text-muted-foreground">
                             <BookOpen className="h-3.5 w-3.5" />
-                            <span>{(batch as any).weeks_count ?? 0} week{((batch as any).weeks_count ?? 0) !== 1 ? 's' : ''}</span>
+                            <span>{batch.weeks_count ?? 0} week{(batch.weeks_count ?? 0) !== 1 ? 's' : ''}</span>
                           </div>
                         </div>
                         <Progress value={batch.progress_percent} className="h-2" />
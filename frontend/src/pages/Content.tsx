@@ -380,28 +380,75 @@ export default function Content() {
           console.warn('Failed to parse video duration', err);
         }
 
-        // 1. Initialize Upload
-        const initRes = await courseModuleApi.initMultipartUpload(videoFile.name, videoFile.type, videoFile.size);
-        if (!initRes.success) throw new Error(initRes.message);
-
-        const { upload_id, key, part_urls, chunk_size } = initRes.data;
-        const uploadedParts = [];
+        // 1. Resume the unfinished upload this browser started for the same file, or initialize a new one
+        const resumeStorageKey = `multipartUpload:${videoFile.name}:${videoFile.size}:${videoFile.lastModified}`;
+        const savedUploadId = localStorage.getItem(resumeStorageKey);
+        let uploadData: any = null;
+        if (savedUploadId) {
+          try {
+            const resumeRes = await courseModuleApi.resumeMultipartUpload(savedUploadId);
+            if (resumeRes.success) uploadData = resumeRes.data;
+          } catch {
+            // Upload is gone (completed, aborted or reaped); start over
+          }
+          if (!uploadData) localStorage.removeItem(resumeStorageKey);
+        }
+        if (!uploadData) {
+          const initRes = await courseModuleApi.initMultipartUpload(videoFile.name, videoFile.type, videoFile.size);
+          if (!initRes.success) throw new Error(initRes.message);
+          uploadData = initRes.data;
+          localStorage.setItem(resumeStorageKey, uploadData.upload_id);
+        }
 
-        // 2. Map chunks and upload sequentially (or carefully in parallel)
-        for (let i = 0; i < part_urls.length; i++) {
-          const start = i * chunk_size;
+        const { upload_id, key, chunk_size, total_parts } = uploadData;
+        const concurrency: number = Math.max(1, uploadData.concurrency || 1);
+        const uploadedParts: { ETag: string, PartNumber: number }[] = [...(uploadData.completed_parts || [])];
+        const pendingParts: number[] = uploadData.missing_parts
+          || Array.from({ length: total_parts }, (_, i) => i + 1);
+        const partNumbers: number[] = uploadData.part_numbers
+          || Array.from({ length: uploadData.part_urls.length }, (_, i) => i + 1);
+        const partUrls = new Map<number, string>(
+          partNumbers.map((partNumber, i) => [partNumber, uploadData.part_urls[i]])
+        );
+        const partProgress: number[] = new Array(total_parts).fill(0);
+        uploadedParts.forEach((part) => { partProgress[part.PartNumber - 1] = 1; });
+        let pendingWindow: Promise<void> | null = null;
+        let nextIndex = 0;
+
+        // Part URLs are issued in windows; fetch the next one when we run out
+        const getPartUrl = async (index: number) => {
+          const partNumber = pendingParts[index];
+          while (!partUrls.has(partNumber)) {
+            if (!pendingWindow) {
+              const wanted = pendingParts.slice(index).filter((n) => !partUrls.has(n));
+              pendingWindow = courseModuleApi.getUploadPartUrls(key, upload_id, wanted)
+                .then((partsRes) => {
+                  if (!partsRes.success) throw new Error(partsRes.message);
+                  partsRes.data.part_numbers.forEach((n: number, j: number) => partUrls.set(n, partsRes.data.part_urls[j]));
+                })
+                .finally(() => { pendingWindow = null; });
+            }
+            await pendingWindow;
+          }
+          return partUrls.get(partNumber) as string;
+        };
+
+        const uploadPart = async (index: number) => {
+          const partNumber = pendingParts[index];
+          const start = (partNumber - 1) * chunk_size;
           const end = Math.min(start + chunk_size, videoFile.size);
           const chunk = videoFile.slice(start, end);
+          const partUrl = await getPartUrl(index);
 
           // PUT to pre-signed URL directly bypassing Django
-          const uploadRes = await axios.put(part_urls[i], chunk, {
+          const uploadRes = await axios.put(partUrl, chunk, {
             headers: { 'Content-Type': videoFile.type },
             onUploadProgress: (progressEvent) => {
               if (progressEvent.total) {
                 // Calculate total precise progress across chunks
-                const chunkPct = progressEvent.loaded / progressEvent.total;
-                const overallPct = Math.round(((i + chunkPct) / part_urls.length) * 100);
-                setUploadProgress(overallPct);
+                partProgress[partNumber - 1] = progressEvent.loaded / progressEvent.total;
+                const done = partProgress.reduce((sum, pct) => sum + pct, 0);
+                setUploadProgress(Math.round((done / total_parts) * 100));
               }
             }
           });
@@ -409,13 +456,24 @@ export default function Content() {
           // Retrieve ETag from header response
           let etag = uploadRes.headers['etag'] || uploadRes.headers['ETag'];
           if (!etag) throw new Error("Storage server didn't return an ETag for the part.");
-          
-          uploadedParts.push({ ETag: etag, PartNumber: i + 1 });
-        }
+
+          uploadedParts.push({ ETag: etag, PartNumber: partNumber });
+        };
+
+        // 2. Upload the remaining chunks with the concurrency suggested by the server
+        const worker = async () => {
+          while (nextIndex < pendingParts.length) {
+            const index = nextIndex++;
+            await uploadPart(index);
+          }
+        };
+        await Promise.all(Array.from({ length: Math.min(concurrency, pendingParts.length) }, worker));
+        uploadedParts.sort((a, b) => a.PartNumber - b.PartNumber);
 
         // 3. Complete Upload
         const completeRes = await courseModuleApi.completeMultipartUpload(key, upload_id, uploadedParts);
         if (!completeRes.success) throw new Error("Failed to finalize upload.");
+        localStorage.removeItem(resumeStorageKey);
         
         finalVideoKey = completeRes.data.video_key;
       }